@@ -0,0 +1,94 @@
+from queue import Queue
+
+from telegram.utils.request import Request
+from telegram.ext import Dispatcher, JobQueue, CommandHandler, CallbackQueryHandler, PollHandler, PollAnswerHandler
+
+from config import BOT_TOKEN, DISPATCHER_WORKERS, POLL_CHECK_INTERVAL, SHARED_JOBS_SWEEP_INTERVAL
+from services.events import subscribe, RATINGS_CHANGED
+from services.shared_jobs import run_due_shared_jobs, rearm_shared_jobs
+from services.leader import leader_only
+from services.metrics import instrument_handler
+from services.tracing import trace_handler, install_service_tracing
+from services.outbound import ScheduledBot
+from handlers.generate_teams import generate_teams
+from handlers.result import result
+from handlers.delete import delete
+from handlers.stats import stats, prerender_charts_job
+from handlers.leaderboard import leaderboard
+from handlers.help_command import help_command
+from handlers.button_handler import button_handler
+from handlers.appeal import appeal, check_polls_manual, periodic_poll_check
+from handlers.poll_handler import poll_handler, poll_answer_handler
+from handlers.ready import ready
+
+
+def build_bot():
+    """
+    Bot з пулом з'єднань під паралельні воркери (за замовчуванням у PTB лише 1)
+    і вихідною чергою з урахуванням flood-лімітів Telegram.
+    """
+    return ScheduledBot(token=BOT_TOKEN, request=Request(con_pool_size=DISPATCHER_WORKERS + 4))
+
+
+def instrument(name, callback):
+    """Латентність у /metrics + коренева траса для /debug/traces"""
+    return instrument_handler(name, trace_handler(name, callback))
+
+
+def register_handlers(dispatcher):
+    # Кожен хендлер обгорнутий для гістограми латентності та трасування
+    commands = {
+        "generate_teams": generate_teams,
+        "result": result,
+        "delete": delete,
+        "stats": stats,
+        "leaderboard": leaderboard,
+        "help": help_command,
+        "start": help_command,
+        "appeal": appeal,
+        "check_polls": check_polls_manual,
+        "ready": ready,
+    }
+    for command, callback in commands.items():
+        dispatcher.add_handler(CommandHandler(command, instrument(command, callback)))
+    dispatcher.add_handler(CallbackQueryHandler(instrument("button", button_handler)))
+    dispatcher.add_handler(PollHandler(instrument("poll", poll_handler)))
+    dispatcher.add_handler(PollAnswerHandler(instrument("poll_answer", poll_answer_handler)))
+
+
+def register_jobs(job_queue):
+    # Таймери закриття polls зі state_store (переживають рестарт) — кожен воркер
+    # ставить їх собі, виконає той, хто першим візьме claim
+    rearm_shared_jobs(job_queue)
+
+    # Періодичні jobs виконує лише процес-лідер (див. services/leader.py).
+    # Обидві — лише страховка для таймерів, що не спрацювали, тому рідко
+    job_queue.run_repeating(
+        leader_only(instrument("job:shared_jobs", run_due_shared_jobs)),
+        interval=SHARED_JOBS_SWEEP_INTERVAL, first=SHARED_JOBS_SWEEP_INTERVAL
+    )
+    job_queue.run_repeating(
+        leader_only(instrument("job:periodic_poll_check", periodic_poll_check)),
+        interval=POLL_CHECK_INTERVAL, first=60
+    )
+    print(f"✅ Periodic poll checker started (every {POLL_CHECK_INTERVAL // 60} minutes)")
+
+    # 🖼 Прогрів графіків після зміни рейтингів
+    def on_ratings_changed(players, **_):
+        if players:
+            job_queue.run_once(prerender_charts_job, when=0, context={"players": players})
+
+    subscribe(RATINGS_CHANGED, on_ratings_changed)
+
+
+def build_dispatcher(bot):
+    """Спільна збірка Dispatcher + JobQueue для всіх точок входу (Flask, asyncio)"""
+    update_queue = Queue()
+    job_queue = JobQueue()
+    dispatcher = Dispatcher(bot, update_queue, use_context=True, job_queue=job_queue)
+    job_queue.set_dispatcher(dispatcher)
+    # Усі модулі services/ вже імпортовані хендлерами — підміняємо функції на трасовані
+    install_service_tracing()
+    register_handlers(dispatcher)
+    register_jobs(job_queue)
+    return dispatcher, job_queue
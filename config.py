@@ -31,3 +31,80 @@ INCOMPATIBLE_PAIRS = [
     ("Єгор Верзун", "Максим Вірченко"),
     ("Богдан Бурко", "Аліна Середа")
 ]
+
+# Різноманітність складів (штраф за повторні пари гравців)
+TEAMMATE_HISTORY_HALF_LIFE_DAYS = 28
+TEAMMATE_HISTORY_TTL = 60
+TEAMMATE_VARIETY_WEIGHT = 10
+
+# Кеш готових гравців (Final Score), секунди
+READY_ROSTER_TTL = 60
+
+# Графіки рейтингу
+# Telegram стискає фото до 1280 px по довшій стороні, тож 10" × 128 dpi — без втрат
+CHART_PROFILES = {
+    "telegram": {"figsize": (10, 5), "dpi": 128},
+    "hires": {"figsize": (12, 6), "dpi": 300},
+}
+CHART_PROFILE = os.environ.get("CHART_PROFILE", "telegram")
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", "64"))
+CHART_CACHE_DIR = os.environ.get("CHART_CACHE_DIR")  # опціональний дисковий кеш
+CHART_RENDER_WORKERS = int(os.environ.get("CHART_RENDER_WORKERS", "2"))
+CHART_RENDER_TIMEOUT = int(os.environ.get("CHART_RENDER_TIMEOUT", "30"))
+# Чат (напр. приватний канал бота) для попереднього завантаження графіків і отримання file_id
+CHART_PREUPLOAD_CHAT_ID = os.environ.get("CHART_PREUPLOAD_CHAT_ID")
+
+# Потоки, що обробляють чергу оновлень з webhook
+DISPATCHER_WORKERS = int(os.environ.get("DISPATCHER_WORKERS", "4"))
+
+# Захист від повторних доставок webhook (update_id)
+UPDATE_DEDUP_WINDOW = int(os.environ.get("UPDATE_DEDUP_WINDOW", "3600"))
+UPDATE_DEDUP_SIZE = int(os.environ.get("UPDATE_DEDUP_SIZE", "10000"))
+UPDATE_DEDUP_DB = os.environ.get("UPDATE_DEDUP_DB")  # напр. /var/data/updates.sqlite3
+
+# asyncio-режим (main_async.py): хендлери виконуються щонайбільше в
+# ASYNC_HANDLER_THREADS потоках; ASYNC_MAX_INFLIGHT — скільки update'ів може чекати
+ASYNC_MAX_INFLIGHT = int(os.environ.get("ASYNC_MAX_INFLIGHT", "200"))
+ASYNC_HANDLER_THREADS = int(os.environ.get("ASYNC_HANDLER_THREADS", "32"))
+ASYNC_SHEETS_CONCURRENCY = int(os.environ.get("ASYNC_SHEETS_CONCURRENCY", "8"))
+
+# Спільний стан між воркерами: sqlite (за замовчуванням) | memory | redis
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", "bot_state.sqlite3")
+STATE_REDIS_URL = os.environ.get("STATE_REDIS_URL", "redis://localhost:6379/0")
+
+# Lease лідера для періодичних jobs (секунди)
+LEADER_LEASE_TTL = int(os.environ.get("LEADER_LEASE_TTL", "30"))
+
+# Таймери закриття polls: зберігаються у state_store і відновлюються при старті.
+# Перевірки нижче — лише страховка на випадок таймера, що не спрацював (секунди)
+SHARED_JOB_CLAIM_TTL = int(os.environ.get("SHARED_JOB_CLAIM_TTL", "300"))
+SHARED_JOBS_SWEEP_INTERVAL = int(os.environ.get("SHARED_JOBS_SWEEP_INTERVAL", "300"))
+POLL_CHECK_INTERVAL = int(os.environ.get("POLL_CHECK_INTERVAL", "900"))
+# Скільки триває claim на фіналізацію poll'а, якщо воркер упаде посеред неї
+POLL_CLAIM_TTL = int(os.environ.get("POLL_CLAIM_TTL", "120"))
+
+# Google Sheets: gspread (за замовчуванням) | fake — офлайн-таблиця з JSON
+SHEETS_BACKEND = os.environ.get("SHEETS_BACKEND", "gspread")
+SHEETS_FAKE_PATH = os.environ.get("SHEETS_FAKE_PATH")
+
+# Long polling (main_polling.py)
+POLLING_TIMEOUT = int(os.environ.get("POLLING_TIMEOUT", "30"))
+POLLING_BATCH_SIZE = int(os.environ.get("POLLING_BATCH_SIZE", "100"))
+POLLING_OFFSET_PATH = os.environ.get("POLLING_OFFSET_PATH", "polling_offset.json")
+
+# Вихідні повідомлення: ліміти Telegram (повідомлень/сек)
+OUTBOUND_GLOBAL_RATE = float(os.environ.get("OUTBOUND_GLOBAL_RATE", "25"))
+OUTBOUND_CHAT_RATE = float(os.environ.get("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_GROUP_RATE = float(os.environ.get("OUTBOUND_GROUP_RATE", str(20 / 60)))
+OUTBOUND_CHAT_BURST = int(os.environ.get("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_SENDERS = int(os.environ.get("OUTBOUND_SENDERS", "4"))
+
+# Скільки секунд даємо на дозавершення роботи при зупинці
+SHUTDOWN_DEADLINE = float(os.environ.get("SHUTDOWN_DEADLINE", "25"))
+
+# Трасування хендлерів і профайлер (ендпоінти /debug/* доступні лише з ADMIN_TOKEN)
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "1") == "1"
+TRACE_SLOWEST = int(os.environ.get("TRACE_SLOWEST", "20"))
+PROFILE_MAX_SECONDS = int(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
@@ -3,14 +3,18 @@ from datetime import datetime, timedelta
 from telegram import Update, Poll
 from telegram.ext import CallbackContext
 
-from services.sheets import spreadsheet, appeals_sheet, get_existing_teams
+from services.sheets import spreadsheet, appeals_sheet
 from services.appeal_service import (
     can_create_appeal_today,
     get_today_teams_and_players,
     create_appeal_record,
     is_appeal_active,
-    process_poll_results
+    process_polls_results
 )
+from services.active_polls import active_polls
+from services.appeals_index import appeals_index
+from services.poll_claims import poll_claims, UNKNOWN
+from services.shared_jobs import register_job_callback, schedule_shared_job
 from utils.misc import get_today_date
 
 
@@ -42,8 +46,8 @@ def appeal(update: Update, context: CallbackContext):
         polls_created = 0
         chat_id = update.message.chat_id
 
-        # Створюємо polls і зберігаємо інформацію для автоматичного закриття
-        poll_jobs = []
+        # Створюємо polls; рядки 'Appeals' для всіх команд записуємо одним append_rows
+        appeal_rows = []
 
         for team_name, players in teams_data.items():
             if len(players) < 2:
@@ -53,45 +57,66 @@ def appeal(update: Update, context: CallbackContext):
             question = f"🏐 Who contributed the most in team {team_name}?"
 
             # Створюємо poll БЕЗ open_period (будемо закривати вручну)
-            poll_message = context.bot.send_poll(
-                chat_id=chat_id,
-                question=question,
-                options=poll_players,
-                is_anonymous=True,
-                allows_multiple_answers=True
-            )
+            try:
+                poll_message = context.bot.send_poll(
+                    chat_id=chat_id,
+                    question=question,
+                    options=poll_players,
+                    is_anonymous=True,
+                    allows_multiple_answers=True
+                )
+            except Exception as e:
+                # Уже створені polls все одно мають потрапити в 'Appeals' нижче
+                print(f"❌ Failed to create poll for team {team_name}: {e}")
+                continue
 
-            # Зберігаємо інформацію про poll
-            close_time = datetime.now() + timedelta(minutes=10)  # 10 хвилин
-            appeals_sheet.append_row([
-                appeal_id,
-                today,
-                team_name,
-                poll_message.poll.id,
-                poll_message.message_id,
-                chat_id,
-                'active',
-                close_time.strftime("%Y-%m-%d %H:%M:%S")
-            ])
-
-            # Створюємо індивідуальну job для кожного poll
-            job_name = f"close_poll_{poll_message.poll.id}"
-
-            context.job_queue.run_once(
-                close_single_poll,
-                when=600,  # 10 хвилин в секундах
-                context={
-                    'chat_id': chat_id,
-                    'poll_id': poll_message.poll.id,
-                    'message_id': poll_message.message_id,
-                    'team_name': team_name,
-                    'appeal_id': appeal_id
-                },
-                name=job_name
-            )
+            close_time = (datetime.now() + timedelta(minutes=10)).replace(microsecond=0)  # 10 хвилин
+            appeal_rows.append({
+                'appeal_id': appeal_id,
+                'date': today,
+                'team_name': team_name,
+                'poll_id': poll_message.poll.id,
+                'message_id': poll_message.message_id,
+                'chat_id': chat_id,
+                'status': 'active',
+                'end_time': close_time.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+
+        if appeal_rows:
+            # Зберігаємо інформацію про polls
+            try:
+                response = appeals_sheet.append_rows([appeals_index.to_row(row) for row in appeal_rows])
+            except Exception:
+                # Без рядків 'Appeals' polls не закрити й не порахувати — зупиняємо вже надіслані
+                stop_unrecorded_polls(context, appeal_rows)
+                raise
+            appeals_index.append(appeal_rows, response)
+
+        polls = []
+        for row in appeal_rows:
+            close_time = datetime.strptime(row['end_time'], "%Y-%m-%d %H:%M:%S")
+            poll_info = {
+                'poll_id': row['poll_id'],
+                'chat_id': chat_id,
+                'message_id': row['message_id'],
+                'team_name': row['team_name'],
+            }
+            active_polls.add(end_time=close_time, **poll_info)
+            polls.append(poll_info)
 
             polls_created += 1
-            print(f"✅ Created poll {poll_message.poll.id} for team {team_name}, will close at {close_time}")
+            print(f"✅ Created poll {row['poll_id']} for team {row['team_name']}, will close at {close_time}")
+
+        if polls:
+            # Одна job на всю апеляцію: polls закриваються разом, і бонуси MVP
+            # за день нараховуються одним проходом
+            schedule_shared_job(
+                context.job_queue,
+                close_appeal_polls,
+                when=600,  # 10 хвилин в секундах
+                context={'chat_id': chat_id, 'appeal_id': appeal_id, 'polls': polls},
+                name=f"close_appeal_{appeal_id}"
+            )
 
         if polls_created == 0:
             update.message.reply_text(
@@ -112,70 +137,122 @@ def appeal(update: Update, context: CallbackContext):
         update.message.reply_text(f"⚠️ An error occurred while creating the appeal: {e}")
 
 
-def close_single_poll(context: CallbackContext):
-    """Закриває один конкретний poll після завершення часу"""
+def stop_unrecorded_polls(context, appeal_rows):
+    """Закриває надіслані polls, рядки яких не вдалося записати в 'Appeals'"""
+    for row in appeal_rows:
+        try:
+            context.bot.stop_poll(chat_id=row['chat_id'], message_id=row['message_id'])
+            print(f"🛑 Stopped unrecorded poll {row['poll_id']} for team {row['team_name']}")
+        except Exception as e:
+            print(f"❌ Failed to stop unrecorded poll {row['poll_id']}: {e}")
+
+
+def close_polls(context, polls, results=None):
+    """
+    Єдиний конвеєр фіналізації polls (job апеляції, періодична перевірка,
+    /check_polls, PollHandler). Кожен poll спершу бере claim — повторні
+    тригери того ж poll'а стають no-op без звернень до Telegram і таблиці.
+    Далі stop_poll і спільна обробка результатів: бонуси MVP за день —
+    одним проходом, статуси — одним batch_update.
+    results — {poll_id: (результати, total_voter_count)} для polls, які
+    Telegram уже закрив (stop_poll не потрібен).
+    Повертає (фіналізовані, невдалі) — списки poll_info і (poll_info, помилка).
+    """
+    results = results or {}
+    stopped, already_closed, failed = [], [], []
+    for poll_info in polls:
+        poll_id = poll_info['poll_id']
+        # Забираємо з індексу, щоб періодична перевірка не закривала його паралельно
+        active_polls.discard(poll_id)
+        token, outcome = poll_claims.claim(poll_id)
+        if outcome == UNKNOWN:
+            print(f"⚠️ Poll {poll_id} not found in Appeals sheet")
+            failed.append((poll_info, LookupError(f"poll {poll_id} not found in Appeals")))
+            continue
+        if token is None:
+            print(f"⏭ Poll {poll_id} is already finalized, skipping")
+            continue
+
+        if poll_id in results:
+            stopped.append((poll_info, token) + tuple(results[poll_id]))
+            continue
+        try:
+            poll = context.bot.stop_poll(chat_id=poll_info['chat_id'], message_id=poll_info['message_id'])
+            print(f"✅ Poll {poll_id} closed successfully")
+            poll_results = {opt.text: opt.voter_count for opt in poll.options}
+            stopped.append((poll_info, token, poll_results, poll.total_voter_count))
+        except Exception as e:
+            if "Poll has already been closed" in str(e):
+                print(f"⚠️ Poll {poll_id} was already closed")
+                already_closed.append((poll_info, token))
+            else:
+                print(f"❌ Failed to close poll {poll_id}: {e}")
+                poll_claims.release(poll_id, token)
+                failed.append((poll_info, e))
+
+    winners, bonuses = {}, {}
+    if stopped:
+        winners, bonuses = process_polls_results(
+            {info['poll_id']: poll_results for info, _, poll_results, _ in stopped})
+    # Все одно оновлюємо статус
+    for poll_info, token in already_closed:
+        update_poll_status_in_sheet(poll_info['poll_id'], 'completed')
+
+    for poll_info, token in [(info, token) for info, token, _, _ in stopped] + already_closed:
+        poll_claims.complete(poll_info['poll_id'], token)
+
+    for poll_info, _, poll_results, total_voter_count in stopped:
+        send_poll_results(context, poll_info['chat_id'], poll_info['team_name'], poll_results,
+                          winners.get(poll_info['poll_id']), total_voter_count,
+                          bonuses.get(poll_info['poll_id']))
+
+    return [info for info, _, _, _ in stopped] + [info for info, _ in already_closed], failed
+
+
+@register_job_callback
+def close_appeal_polls(context: CallbackContext):
+    """Закриває всі polls апеляції після завершення часу"""
     job_data = context.job.context
-    chat_id = job_data['chat_id']
-    poll_id = job_data['poll_id']
-    message_id = job_data['message_id']
-    team_name = job_data['team_name']
-    appeal_id = job_data['appeal_id']
-
-    print(f"🛑 Attempting to close poll {poll_id} for team {team_name}")
-
-    try:
-        # Закриваємо poll
-        poll = context.bot.stop_poll(chat_id=chat_id, message_id=message_id)
-        print(f"✅ Poll {poll_id} closed successfully")
-
-        # Обробляємо результати
-        poll_results = {opt.text: opt.voter_count for opt in poll.options}
-        winner = process_poll_results(poll_id, poll_results)
-
-        # Оновлюємо статус в таблиці Appeals
-        update_poll_status_in_sheet(poll_id, 'completed')
-
-        # Відправляємо результати в чат
-        send_poll_results(context, chat_id, team_name, poll_results, winner, poll.total_voter_count)
+    print(f"🛑 Attempting to close {len(job_data['polls'])} polls of appeal {job_data['appeal_id']}")
+
+    closed, failed = close_polls(context, job_data['polls'])
+    for poll_info, error in failed:
+        # Повторить періодична перевірка
+        active_polls.add(end_time=datetime.now(), **poll_info)
+        try:
+            context.bot.send_message(
+                chat_id=poll_info['chat_id'],
+                text=f"⚠️ Error processing poll for team {poll_info['team_name']}: {error}"
+            )
+        except:
+            pass
+    print(f"🎉 Appeal {job_data['appeal_id']}: {len(closed)} polls processed")
 
-        print(f"🎉 Poll {poll_id} processed successfully")
 
-    except Exception as e:
-        error_msg = str(e)
-        if "Poll has already been closed" in error_msg:
-            print(f"⚠️ Poll {poll_id} was already closed")
-            # Все одно оновлюємо статус
-            update_poll_status_in_sheet(poll_id, 'completed')
-        else:
-            print(f"❌ Failed to close poll {poll_id}: {e}")
-            # Відправляємо повідомлення про помилку
-            try:
-                context.bot.send_message(
-                    chat_id=chat_id,
-                    text=f"⚠️ Error processing poll for team {team_name}: {error_msg}"
-                )
-            except:
-                pass
+@register_job_callback
+def close_single_poll(context: CallbackContext):
+    """Закриває один poll (jobs, заплановані до переходу на close_appeal_polls)"""
+    job_data = context.job.context
+    context.job.context = dict(job_data, polls=[{
+        'poll_id': job_data['poll_id'],
+        'chat_id': job_data['chat_id'],
+        'message_id': job_data['message_id'],
+        'team_name': job_data['team_name'],
+    }])
+    close_appeal_polls(context)
 
 
 def update_poll_status_in_sheet(poll_id, new_status):
     try:
-        all_rows = appeals_sheet.get_all_values()
-        headers = all_rows[0]
-        col_idx = {name.strip().lower(): i for i, name in enumerate(headers)}
-
-        for i, row in enumerate(all_rows[1:], start=2):
-            if len(row) > col_idx['poll_id'] and row[col_idx['poll_id']] == poll_id:
-                appeals_sheet.update_cell(i, col_idx['status'] + 1, new_status)  # +1 бо 1-based
-                print(f"✅ Updated poll {poll_id} status to {new_status}")
-                return
-        print(f"⚠️ Poll {poll_id} not found in Appeals sheet")
+        # Позиція рядка — з індексу; якщо статус уже такий, запису немає
+        if appeals_index.set_status(poll_id, new_status):
+            print(f"✅ Updated poll {poll_id} status to {new_status}")
     except Exception as e:
         print(f"❌ Error updating poll status: {e}")
 
 
-def send_poll_results(context, chat_id, team_name, poll_results, winner, total_voter_count):
-    """Відправляє результати poll'у в чат"""
+def send_poll_results(context, chat_id, team_name, poll_results, winner, total_voter_count, bonus=None):
+    """Відправляє результати poll'у в чат; bonus — фактично нараховані бали (None — не записано)"""
     try:
         if total_voter_count < 6:
             message = f"📊 Poll ended for team {team_name}!\n\n"
@@ -188,7 +265,12 @@ def send_poll_results(context, chat_id, team_name, poll_results, winner, total_v
             message = f"📊 Poll ended for team {team_name}!\n\n"
             message += f"🏆 MVP selected: **{winner}**\n"
             message += f"✅ Received {winner_votes} out of {total_voter_count} votes ({win_percentage:.1f}%)\n"
-            message += f"🎉 Bonus points added for each match played today!\n\n"
+            if bonus is None:
+                message += "⚠️ Bonus points could not be saved. Please contact an admin.\n\n"
+            elif bonus > 0:
+                message += f"🎉 +{bonus} bonus points added for the matches played today!\n\n"
+            else:
+                message += "ℹ️ No bonus points added (no matches found for today).\n\n"
         else:
             max_votes = max(poll_results.values()) if poll_results else 0
             max_percentage = (max_votes / total_voter_count * 100) if total_voter_count > 0 else 0
@@ -209,6 +291,14 @@ def send_poll_results(context, chat_id, team_name, poll_results, winner, total_v
         print(f"❌ Error sending poll results: {e}")
 
 
+def close_expired_polls(context, polls):
+    """Закриває прострочені polls з індексу; невдалі повертаються в індекс для наступної перевірки"""
+    closed, failed = close_polls(context, polls)
+    for poll_info, _ in failed:
+        active_polls.add(**poll_info)
+    return closed
+
+
 def check_polls_manual(update: Update, context: CallbackContext):
     """Ручна перевірка та закриття прострочених polls"""
     if update.message.chat.type == 'private':
@@ -217,69 +307,13 @@ def check_polls_manual(update: Update, context: CallbackContext):
 
     try:
         chat_id = update.message.chat_id
-        current_time = datetime.now()
-        print(f"🧪 Manual poll check at {current_time}")
-
-        all_rows = appeals_sheet.get_all_values()
-        if len(all_rows) <= 1:
-            update.message.reply_text("ℹ️ No polls found.")
-            return
-
-        headers = all_rows[0]
-        closed_polls = 0
-
-        # Створюємо індекс колонок
-        col_idx = {}
-        for idx, header in enumerate(headers):
-            col_idx[header.strip().lower()] = idx
-
-        for i, row in enumerate(all_rows[1:], start=2):
-            if len(row) < 8:
-                continue
-
-            try:
-                status = row[col_idx.get('status', 6)].strip()
-                row_chat_id = int(row[col_idx.get('chat_id', 5)])
-                poll_id = row[col_idx.get('poll_id', 3)].strip()
-                message_id = int(row[col_idx.get('message_id', 4)])
-                team_name = row[col_idx.get('team_name', 2)].strip()
-                end_time_str = row[col_idx.get('end_time', 7)].strip()
-
-                if status != "active" or row_chat_id != chat_id:
-                    continue
-
-                try:
-                    end_time = datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    print(f"⚠️ Invalid date format: {end_time_str}")
-                    continue
-
-                if current_time >= end_time:
-                    print(f"🕐 Poll {poll_id} expired, closing manually")
+        print(f"🧪 Manual poll check at {datetime.now()}")
 
-                    try:
-                        poll = context.bot.stop_poll(chat_id=chat_id, message_id=message_id)
-
-                        poll_results = {opt.text: opt.voter_count for opt in poll.options}
-                        winner = process_poll_results(poll_id, poll_results)
-
-                        # Оновлюємо статус
-                        appeals_sheet.update_cell(i, col_idx.get('status', 6) + 1, 'completed')
-
-                        send_poll_results(context, chat_id, team_name, poll_results, winner, poll.total_voter_count)
-
-                        closed_polls += 1
-                        print(f"✅ Manually closed poll {poll_id}")
-
-                    except Exception as poll_error:
-                        if "Poll has already been closed" in str(poll_error):
-                            appeals_sheet.update_cell(i, col_idx.get('status', 6) + 1, 'completed')
-                            print(f"⚠️ Poll {poll_id} already closed")
-                        else:
-                            print(f"❌ Error closing poll {poll_id}: {poll_error}")
-
-            except Exception as row_error:
-                print(f"⚠️ Error processing row {i}: {row_error}")
+        # Прострочені polls цього чату — з індексу (спільного для воркерів), без читання 'Appeals'
+        expired = active_polls.pop_expired(chat_id=chat_id)
+        for poll_info in expired:
+            print(f"🕐 Poll {poll_info['poll_id']} expired, closing manually")
+        closed_polls = len(close_expired_polls(context, expired)) if expired else 0
 
         if closed_polls > 0:
             update.message.reply_text(f"✅ Manually closed {closed_polls} expired polls.")
@@ -291,6 +325,20 @@ def check_polls_manual(update: Update, context: CallbackContext):
         update.message.reply_text(f"⚠️ Error checking polls: {e}")
 
 
+def periodic_poll_check(context: CallbackContext):
+    """Періодично закриває прострочені polls з індексу active_polls"""
+    try:
+        expired = active_polls.pop_expired()
+        if not expired:
+            return
+        print(f"🕐 Periodic check: closing {len(expired)} expired polls")
+        closed = close_expired_polls(context, expired)
+        print(f"✅ Periodic check: successfully closed {len(closed)} polls")
+
+    except Exception as e:
+        print(f"❌ Error in periodic poll check: {e}")
+
+
 # Функція для очищення старих jobs (додаткова безпека)
 def cleanup_old_jobs(context: CallbackContext):
     """Очищує старі завершені jobs"""
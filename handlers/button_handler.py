@@ -2,6 +2,7 @@ from telegram import Update
 from telegram.ext import CallbackContext
 
 from services.sheets import spreadsheet, teams_sheet
+from services.teams_index import teams_index
 from handlers.generate_teams import generate_teams, pending_teams
 
 
@@ -27,6 +28,7 @@ def button_handler(update: Update, context: CallbackContext):
 
         row_data = [row.get(col, "") for col in header]
         teams_sheet.append_row(row_data)
+        teams_index.invalidate()
 
         query.edit_message_text("✅ Teams confirmed and saved.")
 
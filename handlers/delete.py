@@ -2,7 +2,7 @@ from telegram import Update
 from telegram.ext import CallbackContext
 from datetime import datetime
 
-from services.sheets import match_sheet, rating_sheet
+from services.sheets import match_sheet, rating_sheet, invalidate_cached
 from utils.misc import get_today_date, is_quota_exceeded_error
 
 
@@ -38,12 +38,15 @@ def delete(update: Update, context: CallbackContext):
         match_id_to_delete = deleted_row[0] if deleted_row else None
 
         match_sheet.delete_rows(last_row_index)
+        invalidate_cached("matches_rows")
 
         # Видаляємо пов'язаний запис у Rating
         rating_rows = rating_sheet.get_all_values()
         for i, row in enumerate(rating_rows[1:], start=2):  # Пропускаємо заголовок
             if row and row[0] == match_id_to_delete:
                 rating_sheet.delete_rows(i)
+                # Наступний /result у будь-якому воркері рахує від попереднього рядка
+                invalidate_cached("ratings")
                 break
 
         update.message.reply_text("✅ Last match has been deleted.")
@@ -1,12 +1,23 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CallbackContext
-from faker import Faker
 
 from services.team_balancer import get_team_candidates, regenerate_teams_logic
+from services.teammate_history import get_teammate_history
+from services.state_store import SharedDict
 from config import INCOMPATIBLE_PAIRS
 
-faker = Faker("uk_UA")  # англійською en_US
-pending_teams = {}
+_faker = None
+# Спільні для всіх воркерів: Confirm може потрапити в інший процес
+pending_teams = SharedDict("pending_teams", ttl=24 * 3600)
+
+
+def get_faker():
+    """Faker створюється при першій генерації команд, а не під час імпорту"""
+    global _faker
+    if _faker is None:
+        from faker import Faker
+        _faker = Faker("uk_UA")  # англійською en_US
+    return _faker
 
 # 🔁 Команда генерації команд
 def generate_teams(update: Update, context: CallbackContext):
@@ -34,8 +45,8 @@ def generate_teams(update: Update, context: CallbackContext):
         context.bot.send_message(update.message.chat_id, "⚠️ No players are marked as ready.")
         return
 
-    teams, team_sums, team_counts = regenerate_teams_logic(players, num_teams=num_teams)
-    team_names = [faker.word() for _ in range(num_teams)]  # англомовні назви
+    teams, team_sums, team_counts = regenerate_teams_logic(players, num_teams=num_teams, history=get_teammate_history())
+    team_names = [get_faker().word() for _ in range(num_teams)]  # англомовні назви
 
     text = f"📅 Teams for {game_date}:\n"
     for i, team in enumerate(teams):
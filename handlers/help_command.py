@@ -21,6 +21,9 @@ Example: `/result Red 21 - 18 Blue`
 /check_polls
 → receive results of appeal (active 10 minutes after the start of the appeal)  
 
+/ready  
+→ Reload the list of ready players (group admins only)
+
 /delete  
 → Delete the last match of today (admin/group only)
 
@@ -1,8 +1,8 @@
 from telegram import Update
 from telegram.ext import CallbackContext
 
-from services.appeal_service import process_poll_results
-from services.sheets import appeals_sheet
+from services.appeals_index import appeals_index
+from handlers.appeal import close_polls
 
 
 def poll_answer_handler(update: Update, context: CallbackContext):
@@ -10,31 +10,17 @@ def poll_answer_handler(update: Update, context: CallbackContext):
     pass  # Анонімні — не обробляємо
 
 
-def get_chat_id_by_poll_id(poll_id):
-    try:
-        all_rows = appeals_sheet.get_all_values()
-        if not all_rows or len(all_rows) < 2:
-            return None
-
-        headers = all_rows[0]
-        data = all_rows[1:]
-
-        # Побудуємо словник: назва → індекс
-        header_index = {name: idx for idx, name in enumerate(headers)}
-
-        for row in data:
-            if (
-                len(row) > header_index.get("poll_id", -1) and
-                row[header_index["poll_id"]] == poll_id
-            ):
-                chat_id_idx = header_index.get("chat_id")
-                if chat_id_idx is not None and len(row) > chat_id_idx:
-                    return int(row[chat_id_idx])
-        return None
-
-    except Exception as e:
-        print(f"Error while getting chat_id: {e}")
+def get_poll_info(poll_id):
+    """Дані poll'а для конвеєра фіналізації — з індексу 'Appeals'"""
+    entry = appeals_index.get(poll_id)
+    if not entry:
         return None
+    return {
+        'poll_id': poll_id,
+        'chat_id': entry['chat_id'],
+        'message_id': entry['message_id'],
+        'team_name': entry['team_name'],
+    }
 
 
 def poll_handler(update: Update, context: CallbackContext):
@@ -47,104 +33,15 @@ def poll_handler(update: Update, context: CallbackContext):
         return
 
     try:
-        print(f"🔄 Processing closed poll {poll.id}")
-        poll_results = {opt.text: opt.voter_count for opt in poll.options}
-        total_voter_count = poll.total_voter_count
-        winner = process_poll_results(poll.id, poll_results)
-
-        if total_voter_count < 6:
-            message = f"📊 Poll ended!\n\n"
-            message += f"❌ Not enough votes to award bonus points.\n"
-            message += f"Votes received: {total_voter_count}\n"
-            message += f"Required minimum: 6\n\n"
-        elif winner:
-            winner_votes = poll_results[winner]
-            win_percentage = (winner_votes / total_voter_count) * 100
-            message = f"📊 Poll ended!\n\n"
-            message += f"🏆 MVP selected: **{winner}**\n"
-            message += f"✅ Received {winner_votes} out of {total_voter_count} votes ({win_percentage:.1f}%)\n"
-            message += f"🎉 Bonus points added for each match played today!\n\n"
-        else:
-            max_votes = max(poll_results.values()) if poll_results else 0
-            max_percentage = (max_votes / total_voter_count * 100) if total_voter_count > 0 else 0
-            message = f"📊 Poll ended!\n\n"
-            message += f"❌ No player received enough votes (66%+ required).\n"
-            message += f"Top vote count: {max_votes} ({max_percentage:.1f}%)\n\n"
-
-        message += "📈 Poll results:\n"
-        for option, votes in sorted(poll_results.items(), key=lambda x: x[1], reverse=True):
-            percentage = (votes / total_voter_count * 100) if total_voter_count > 0 else 0
-            emoji = "🏆" if winner and option == winner else "•"
-            message += f"{emoji} {option}: {votes} ({percentage:.1f}%)\n"
-
-        chat_id = get_chat_id_by_poll_id(poll.id)
-        if not chat_id:
+        poll_info = get_poll_info(poll.id)
+        if not poll_info:
             print(f"⚠️ Chat ID not found for poll {poll.id}")
             return
 
-        context.bot.send_message(chat_id=chat_id, text=message, parse_mode="Markdown")
-        print(f"✅ Poll {poll.id} results sent to chat {chat_id}")
+        # Зазвичай це відлуння нашого ж stop_poll — тоді claim не вдасться і це no-op
+        poll_results = {opt.text: opt.voter_count for opt in poll.options}
+        close_polls(context, [poll_info], results={poll.id: (poll_results, poll.total_voter_count)})
 
     except Exception as e:
         print(f"❌ Error while processing finished poll: {e}")
 
-
-def scheduled_poll_finalize_job(context: CallbackContext):
-    """Завершує poll через JobQueue і обробляє результати"""
-    job_data = context.job.context
-    chat_id = job_data['chat_id']
-    message_id = job_data['message_id']
-    poll_id = job_data['poll_id']
-    print(f"⏰ Job triggered! Attempting to close poll ID: {poll_id}")
-
-    try:
-        # Зупиняємо poll
-        poll = context.bot.stop_poll(chat_id=chat_id, message_id=message_id)
-        print(f"🛑 Poll {poll_id} stopped automatically via JobQueue")
-        print(f"📊 Final poll state: closed={poll.is_closed}, votes={poll.total_voter_count}")
-
-        # Обробляємо результати
-        poll_results = {opt.text: opt.voter_count for opt in poll.options}
-        winner = process_poll_results(poll.id, poll_results)
-
-        # Відправляємо результати
-        total_voter_count = poll.total_voter_count
-
-        if total_voter_count < 6:
-            message = f"📊 Poll ended automatically!\n\n"
-            message += f"❌ Not enough votes to award bonus points.\n"
-            message += f"Votes received: {total_voter_count}\n"
-            message += f"Required minimum: 6\n\n"
-        elif winner:
-            winner_votes = poll_results[winner]
-            win_percentage = (winner_votes / total_voter_count) * 100
-            message = f"📊 Poll ended automatically!\n\n"
-            message += f"🏆 MVP selected: **{winner}**\n"
-            message += f"✅ Received {winner_votes} out of {total_voter_count} votes ({win_percentage:.1f}%)\n"
-            message += f"🎉 Bonus points added for each match played today!\n\n"
-        else:
-            max_votes = max(poll_results.values()) if poll_results else 0
-            max_percentage = (max_votes / total_voter_count * 100) if total_voter_count > 0 else 0
-            message = f"📊 Poll ended automatically!\n\n"
-            message += f"❌ No player received enough votes (66%+ required).\n"
-            message += f"Top vote count: {max_votes} ({max_percentage:.1f}%)\n\n"
-
-        message += "📈 Final results:\n"
-        for option, votes in sorted(poll_results.items(), key=lambda x: x[1], reverse=True):
-            percentage = (votes / total_voter_count * 100) if total_voter_count > 0 else 0
-            emoji = "🏆" if winner and option == winner else "•"
-            message += f"{emoji} {option}: {votes} ({percentage:.1f}%)\n"
-
-        context.bot.send_message(chat_id=chat_id, text=message, parse_mode="Markdown")
-        print(f"✅ Poll {poll_id} processed and results sent")
-
-    except Exception as e:
-        print(f"❌ Failed to process poll {poll_id}: {e}")
-        # Спробуємо відправити повідомлення про помилку
-        try:
-            context.bot.send_message(
-                chat_id=chat_id,
-                text=f"⚠️ Error processing poll results: {str(e)}"
-            )
-        except:
-            pass
\ No newline at end of file
@@ -0,0 +1,35 @@
+from telegram import Update
+from telegram.ext import CallbackContext
+
+from services.roster import roster_cache
+from utils.misc import is_quota_exceeded_error
+
+
+def ready(update: Update, context: CallbackContext):
+    """Примусово перечитує список готових гравців (тільки для адмінів групи)"""
+    if update.message.chat.type == 'private':
+        update.message.reply_text("⚠️ This command can only be used in a group.")
+        return
+
+    member = context.bot.get_chat_member(update.message.chat_id, update.message.from_user.id)
+    if member.status not in ("administrator", "creator"):
+        update.message.reply_text("⚠️ Only group admins can refresh the ready list.")
+        return
+
+    try:
+        players = roster_cache.get_ready_players(force=True)
+    except Exception as e:
+        if is_quota_exceeded_error(e):
+            update.message.reply_text("❌ Google Sheets quota exceeded. Try again later.")
+        else:
+            update.message.reply_text(f"⚠️ Error while loading ready players: {e}")
+        return
+
+    if not players:
+        update.message.reply_text("⚠️ No players are marked as ready.")
+        return
+
+    message = f"✅ Ready list refreshed: {len(players)} player(s)\n\n"
+    for name, _ in sorted(players):
+        message += f"• {name}\n"
+    update.message.reply_text(message)
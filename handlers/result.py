@@ -2,7 +2,8 @@ import uuid
 from telegram import Update
 from telegram.ext import CallbackContext
 
-from services.sheets import match_sheet, get_existing_teams
+from services.sheets import match_sheet, invalidate_cached
+from services.teams_index import get_existing_teams
 from services.rating_logic import update_rating_table
 from utils.misc import get_today_date, is_quota_exceeded_error
 
@@ -84,6 +85,8 @@ def result(update: Update, context: CallbackContext):
 
     try:
         match_sheet.append_row(row_to_add)
+        # Кількість ігор і дата останньої гри в update_rating_table — вже з новим матчем
+        invalidate_cached("matches_rows")
         rating_changes = update_rating_table(match_id, today, team1, team2, score1, score2)
     except Exception as e:
         if is_quota_exceeded_error(e):
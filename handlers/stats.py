@@ -5,11 +5,12 @@ from services.rating_logic import (
     get_current_ratings,
     get_player_games_count,
     calculate_dynamic_k_factor,
-    get_player_rating_history,
-    create_rating_chart
 )
+from services.chart_cache import chart_cache, load_rating_chart, prerender_rating_charts
+from services.chart_renderer import submit_render
 
 from utils.misc import is_quota_exceeded_error
+from config import CHART_PREUPLOAD_CHAT_ID
 
 
 def stats(update: Update, context: CallbackContext):
@@ -55,11 +56,50 @@ def stats(update: Update, context: CallbackContext):
     update.message.reply_text(message)
 
     if games_played > 0:
-        history = get_player_rating_history(player_name)
-        if history:
-            chart_buffer = create_rating_chart(player_name, history)
-            if chart_buffer:
-                update.message.reply_photo(
-                    photo=chart_buffer,
+        # Текст вже надіслано, графік прийде окремо після рендеру у фоні
+        chat_id = update.message.chat_id
+
+        def send_chart(chart):
+            key, photo = chart
+            if not photo:
+                return
+            try:
+                message = context.bot.send_photo(
+                    chat_id=chat_id,
+                    photo=photo,
+                    caption=f"📈 Rating trend: {player_name}"
+                )
+            except Exception as e:
+                if not isinstance(photo, str):
+                    raise
+                # file_id застарів — завантажуємо графік заново
+                print(f"⚠️ Cached file_id for {player_name} rejected: {e}")
+                chart_cache.forget_file_id(key)
+                key, photo = load_rating_chart(player_name, reuse_file_id=False)
+                if not photo:
+                    return
+                message = context.bot.send_photo(
+                    chat_id=chat_id,
+                    photo=photo,
                     caption=f"📈 Rating trend: {player_name}"
-                )
\ No newline at end of file
+                )
+
+            if not isinstance(photo, str) and message.photo:
+                chart_cache.remember_file_id(key, message.photo[-1].file_id)
+
+        def chart_failed(error):
+            print(f"⚠️ Rating chart for {player_name} failed: {error}")
+            if isinstance(error, TimeoutError):
+                context.bot.send_message(chat_id, "⚠️ The rating chart is taking too long. Please try again shortly.")
+
+        submit_render(load_rating_chart, player_name, on_ready=send_chart, on_failure=chart_failed)
+
+
+def prerender_charts_job(context: CallbackContext):
+    """Фонова job: рендерить графіки гравців після /result, щоб /stats брав їх з кешу"""
+    players = context.job.context["players"]
+    try:
+        rendered = prerender_rating_charts(players, context.bot, CHART_PREUPLOAD_CHAT_ID)
+        print(f"🖼 Pre-rendered {rendered} rating chart(s)")
+    except Exception as e:
+        print(f"⚠️ Chart pre-render failed: {e}")
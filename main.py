@@ -2,21 +2,30 @@ import logging
 import time
 import os
 import atexit
-from flask import Flask, request
-from telegram import Bot, Update
-from telegram.ext import Dispatcher, CallbackContext, JobQueue, CommandHandler, CallbackQueryHandler, PollHandler, PollAnswerHandler
-from queue import Queue
-
-from config import BOT_TOKEN, WEBHOOK_PATH, WEBHOOK_URL
-from handlers.generate_teams import generate_teams
-from handlers.result import result
-from handlers.delete import delete
-from handlers.stats import stats
-from handlers.leaderboard import leaderboard
-from handlers.help_command import help_command
-from handlers.button_handler import button_handler
-from handlers.appeal import appeal, check_polls_manual
-from handlers.poll_handler import poll_handler, poll_answer_handler
+
+from utils.startup import import_phase, mark_boot_finished, startup_report
+
+with import_phase("flask"):
+    from flask import Flask, Response, request
+
+with import_phase("telegram"):
+    from telegram import Update
+
+with import_phase("sheets"):
+    from config import WEBHOOK_PATH, WEBHOOK_URL
+    import services.sheets
+    from services.update_pool import UpdateWorkerPool
+    from services.dedup import update_deduplicator
+    from services.leader import leader_elector
+    from services.outbound import outbound_scheduler
+    from services.shutdown import shutdown_coordinator
+    from services.shared_jobs import pending_shared_jobs_report
+    from services.active_polls import active_polls
+    from services.metrics import render_metrics, register_gauge, CONTENT_TYPE
+    from services.tracing import trace_buffer, profiler, render_folded, is_admin_token
+
+with import_phase("handlers"):
+    from bot_setup import build_bot, build_dispatcher
 
 # 🔧 Налаштування логування
 logging.basicConfig(
@@ -25,108 +34,38 @@ logging.basicConfig(
 )
 
 # 🧠 Telegram Bot
-bot = Bot(token=BOT_TOKEN)
+bot = build_bot()
 
 # 🌐 Flask додаток
 app = Flask(__name__)
 
-# 📬 Dispatcher + JobQueue
-update_queue = Queue()
-job_queue = JobQueue()
-dispatcher = Dispatcher(bot, update_queue, use_context=True, job_queue=job_queue)
-job_queue.set_dispatcher(dispatcher)
-
-# 📌 Реєстрація хендлерів
-dispatcher.add_handler(CommandHandler("generate_teams", generate_teams))
-dispatcher.add_handler(CommandHandler("result", result))
-dispatcher.add_handler(CommandHandler("delete", delete))
-dispatcher.add_handler(CommandHandler("stats", stats))
-dispatcher.add_handler(CommandHandler("leaderboard", leaderboard))
-dispatcher.add_handler(CommandHandler("help", help_command))
-dispatcher.add_handler(CommandHandler("start", help_command))
-dispatcher.add_handler(CommandHandler("appeal", appeal))
-dispatcher.add_handler(CommandHandler("check_polls", check_polls_manual))
-dispatcher.add_handler(CallbackQueryHandler(button_handler))
-dispatcher.add_handler(PollHandler(poll_handler))
-dispatcher.add_handler(PollAnswerHandler(poll_answer_handler))
-
-# Додайте цю функцію в main.py після імпортів
-
-def periodic_poll_check(context: CallbackContext):
-    """Періодично перевіряє та закриває прострочені polls"""
-    try:
-        from datetime import datetime
-        from services.sheets import appeals_sheet
-        from services.appeal_service import process_poll_results
-        from handlers.appeal import send_poll_results, update_poll_status_in_sheet
-
-        current_time = datetime.now()
-
-        all_rows = appeals_sheet.get_all_values()
-        if len(all_rows) <= 1:
-            return
-
-        headers = all_rows[0]
-        col_idx = {header.strip().lower(): idx for idx, header in enumerate(headers)}
-
-        for i, row in enumerate(all_rows[1:], start=2):
-            if len(row) < 8:
-                continue
+# 📬 Dispatcher + JobQueue (хендлери та періодичні jobs — у bot_setup.py)
+dispatcher, job_queue = build_dispatcher(bot)
+update_queue = dispatcher.update_queue
+update_pool = UpdateWorkerPool(dispatcher)
 
-            try:
-                status = row[col_idx.get('status', 6)].strip()
-                if status != 'active':
-                    continue
-
-                end_time_str = row[col_idx.get('end_time', 7)].strip()
-                poll_id = row[col_idx.get('poll_id', 3)].strip()
-                chat_id = int(row[col_idx.get('chat_id', 5)])
-                message_id = int(row[col_idx.get('message_id', 4)])
-                team_name = row[col_idx.get('team_name', 2)].strip()
-
-                try:
-                    end_time = datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    continue
-
-                if current_time >= end_time:
-                    print(f"🕐 Periodic check: closing expired poll {poll_id}")
-
-                    try:
-                        poll = context.bot.stop_poll(chat_id=chat_id, message_id=message_id)
-                        poll_results = {opt.text: opt.voter_count for opt in poll.options}
-                        winner = process_poll_results(poll_id, poll_results)
-
-                        update_poll_status_in_sheet(poll_id, 'completed')
-                        send_poll_results(context, chat_id, team_name, poll_results, winner, poll.total_voter_count)
-
-                        print(f"✅ Periodic check: successfully closed poll {poll_id}")
-
-                    except Exception as poll_error:
-                        if "Poll has already been closed" in str(poll_error):
-                            update_poll_status_in_sheet(poll_id, 'completed')
-                        else:
-                            print(f"❌ Periodic check error for poll {poll_id}: {poll_error}")
-
-            except Exception as row_error:
-                print(f"⚠️ Periodic check: error processing row {i}: {row_error}")
-
-    except Exception as e:
-        print(f"❌ Error in periodic poll check: {e}")
-
-
-# Додайте цей рядок після start_job_queue() у функції запуску:
-
-# Запуск періодичної перевірки polls кожні 2 хвилини
-job_queue.run_repeating(periodic_poll_check, interval=120, first=60)
-print("✅ Periodic poll checker started (every 2 minutes)")
+register_gauge(
+    "bot_update_queue_depth", "Updates waiting in the dispatcher queue and chat lanes",
+    lambda: update_pool.stats()["queue_depth"],
+)
+register_gauge(
+    "bot_update_lanes_active", "Chat lanes currently being processed",
+    lambda: update_pool.stats()["lanes_active"],
+)
 
 # 🚀 Webhook endpoint
 @app.route(WEBHOOK_PATH, methods=["POST"])
 def webhook():
+    # Під час зупинки не приймаємо нові update'и — Telegram доставить їх повторно новому інстансу
+    if not shutdown_coordinator.accepting:
+        return "Shutting down", 503
     json_data = request.get_json(force=True)
+    # Повторна доставка того ж update — відповідаємо OK і нічого не робимо
+    if update_deduplicator.is_duplicate(json_data.get("update_id")):
+        return "OK"
     update = Update.de_json(json_data, bot)
-    dispatcher.process_update(update)
+    # Обробка йде у пулі воркерів, Telegram отримує відповідь одразу
+    update_pool.enqueue(update)
     return "OK"
 
 # 🔍 Health check
@@ -138,9 +77,45 @@ def root():
 def health_check():
     return {
         "status": "healthy",
-        "timestamp": time.time()
+        "timestamp": time.time(),
+        "updates": update_pool.stats(),
+        "duplicate_updates": update_deduplicator.duplicates,
+        "leader": leader_elector.is_leader,
+        "outbound": outbound_scheduler.stats(),
     }
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+# 🐢 Діагностика: найповільніші траси та семплювальний профайлер (лише з ADMIN_TOKEN)
+def is_admin_request():
+    return is_admin_token(request.headers.get("X-Admin-Token") or request.args.get("token"))
+
+@app.route("/debug/traces", methods=["GET"])
+def debug_traces():
+    if not is_admin_request():
+        return "Forbidden", 403
+    return {"recorded": trace_buffer.recorded, "slowest": trace_buffer.slowest()}
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile():
+    if not is_admin_request():
+        return "Forbidden", 403
+    try:
+        stacks = profiler.run(float(request.args.get("seconds", 10)))
+    except ValueError:
+        return "Invalid seconds", 400
+    except RuntimeError as e:
+        return str(e), 409
+    return Response(render_folded(stacks), content_type="text/plain; charset=utf-8")
+
+@app.route("/startup", methods=["GET"])
+def startup():
+    if not is_admin_request():
+        return "Forbidden", 403
+    return startup_report()
+
 # 🔌 Webhook setup
 def setup_webhook():
     if WEBHOOK_URL:
@@ -157,22 +132,58 @@ def start_job_queue():
     except Exception as e:
         logging.error(f"❌ Failed to start JobQueue: {e}")
 
+# 🗳 Індекс активних polls — одне читання 'Appeals' при старті
+def load_active_polls():
+    try:
+        active_polls.load()
+    except Exception as e:
+        logging.error(f"❌ Failed to load active polls: {e}")
+
 # 🛑 Зупинка JobQueue при завершенні
-def stop_job_queue():
+def stop_job_queue(remaining=None):
     try:
         if job_queue:
             job_queue.stop()
             logging.info("✅ JobQueue stopped")
+        return {"ok": True}
     except Exception as e:
         logging.error(f"❌ Error stopping JobQueue: {e}")
+        return {"ok": False, "error": str(e)}
+
+
+def stop_leader(remaining=None):
+    leader_elector.stop()
+    return {"ok": True}
+
+
+# Порядок зупинки: доробити update'и → доставити повідомлення →
+# зафіксувати незакриті poll-jobs → зупинити планувальник і віддати lease
+shutdown_coordinator.add_step("updates", update_pool.drain)
+shutdown_coordinator.add_step("outbound", outbound_scheduler.stop)
+shutdown_coordinator.add_step("poll_jobs", pending_shared_jobs_report)
+shutdown_coordinator.add_step("job_queue", stop_job_queue)
+shutdown_coordinator.add_step("leader", stop_leader)
 
 # Реєструємо функцію для зупинки при завершенні програми
-atexit.register(stop_job_queue)
+atexit.register(shutdown_coordinator.shutdown)
 
 # ▶️ Запуск компонентів
 setup_webhook()
+load_active_polls()
 start_job_queue()
+leader_elector.start()
+update_pool.start()
+mark_boot_finished()
 
 # ▶️ Запуск Flask
 if __name__ == "__main__":
+    import signal
+    import sys
+
+    def handle_sigterm(signum, frame):
+        logging.info("🛑 SIGTERM received, shutting down")
+        shutdown_coordinator.shutdown()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
\ No newline at end of file
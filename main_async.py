@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from telegram import Update
+
+from config import WEBHOOK_PATH, WEBHOOK_URL, ASYNC_MAX_INFLIGHT, ASYNC_HANDLER_THREADS
+from bot_setup import build_bot, build_dispatcher
+from services.async_io import AsyncSheets, AsyncTelegram
+from services.active_polls import active_polls
+from services.dedup import update_deduplicator
+from services.leader import leader_elector
+from services.metrics import render_metrics, register_gauge
+from services.tracing import trace_buffer, profiler, render_folded, is_admin_token
+from services.outbound import outbound_scheduler
+from services.shutdown import shutdown_coordinator
+from services.update_pool import get_lane_key
+
+# 🔧 Налаштування логування
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 🧠 Telegram Bot + Dispatcher (ті самі хендлери, що й у main.py)
+bot = build_bot()
+dispatcher, job_queue = build_dispatcher(bot)
+
+async_sheets = AsyncSheets()
+async_telegram = AsyncTelegram()
+
+# Хендлери PTB синхронні — виконуємо їх у пулі, а цикл подій лише планує.
+# Обмеження: їхні виклики Sheets і Telegram блокують потік пулу, тож одночасно
+# виконується не більше ASYNC_HANDLER_THREADS хендлерів. Решта прийнятих update'ів
+# (до ASYNC_MAX_INFLIGHT) лише дешево чекає в циклі подій — це черга, а не паралельний I/O.
+handler_executor = ThreadPoolExecutor(max_workers=ASYNC_HANDLER_THREADS, thread_name_prefix="async-handler")
+
+stats = {"in_flight": 0, "processed": 0, "failed": 0}
+_inflight = None
+_chat_locks = {}   # lane key → [asyncio.Lock, кількість задач]
+_tasks = set()     # посилання на задачі dispatch, щоб їх не зібрав GC
+
+register_gauge("bot_update_queue_depth", "Updates accepted but not finished yet", lambda: stats["in_flight"])
+register_gauge("bot_update_lanes_active", "Chats with updates in flight", lambda: len(_chat_locks))
+
+
+async def dispatch(update):
+    """Один update як корутина: порядок у межах чату, паралельно між чатами"""
+    key = get_lane_key(update)
+    entry = _chat_locks.setdefault(key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        # Спершу глобальний ліміт: понад ASYNC_MAX_INFLIGHT update'и чекають, не займаючи смугу чату
+        async with _inflight:
+            async with entry[0]:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(handler_executor, dispatcher.process_update, update)
+                stats["processed"] += 1
+    except Exception as e:
+        stats["failed"] += 1
+        logger.error(f"❌ Error while processing update: {e}")
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _chat_locks.pop(key, None)
+        stats["in_flight"] -= 1
+
+
+def _task_done(task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Update task failed: {task.exception()}")
+
+
+# 🚀 Webhook endpoint
+async def webhook(request):
+    if not shutdown_coordinator.accepting:
+        return web.Response(status=503, text="Shutting down")
+    json_data = await request.json()
+    update_id = json_data.get("update_id")
+    if update_deduplicator.is_duplicate(update_id, shared=False):
+        return web.Response(text="OK")
+    # Спільна перевірка (state_store, SQLite) блокує — виконуємо її поза циклом подій
+    if await asyncio.get_running_loop().run_in_executor(None, update_deduplicator.is_shared_duplicate, update_id):
+        return web.Response(text="OK")
+    update = Update.de_json(json_data, bot)
+    stats["in_flight"] += 1
+    task = asyncio.create_task(dispatch(update))
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+    return web.Response(text="OK")
+
+
+# 🔍 Health check
+async def root(request):
+    return web.Response(text="✅ Volleyball Rating Bot is running (asyncio)!")
+
+
+async def health_check(request):
+    return web.json_response({
+        "status": "healthy",
+        "timestamp": time.time(),
+        "updates": dict(stats, chats_active=len(_chat_locks), handler_threads=ASYNC_HANDLER_THREADS),
+        "duplicate_updates": update_deduplicator.duplicates,
+        "leader": leader_elector.is_leader,
+        "outbound": outbound_scheduler.stats(),
+    })
+
+
+async def metrics(request):
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+def is_admin_request(request):
+    return is_admin_token(request.headers.get("X-Admin-Token") or request.query.get("token"))
+
+
+async def debug_traces(request):
+    if not is_admin_request(request):
+        return web.Response(status=403, text="Forbidden")
+    return web.json_response({"recorded": trace_buffer.recorded, "slowest": trace_buffer.slowest()})
+
+
+async def debug_profile(request):
+    if not is_admin_request(request):
+        return web.Response(status=403, text="Forbidden")
+    try:
+        seconds = float(request.query.get("seconds", 10))
+    except ValueError:
+        return web.Response(status=400, text="Invalid seconds")
+    try:
+        # Профайлер блокує потік на час вікна — запускаємо поза циклом подій
+        stacks = await asyncio.get_running_loop().run_in_executor(None, profiler.run, seconds)
+    except RuntimeError as e:
+        return web.Response(status=409, text=str(e))
+    return web.Response(text=render_folded(stacks), content_type="text/plain", charset="utf-8")
+
+
+async def on_startup(app):
+    global _inflight
+    _inflight = asyncio.Semaphore(ASYNC_MAX_INFLIGHT)
+
+    await async_telegram.start()
+    if WEBHOOK_URL:
+        await async_telegram.set_webhook(WEBHOOK_URL)
+        logger.info(f"✅ Webhook set: {WEBHOOK_URL}")
+    else:
+        logger.warning("⚠️ WEBHOOK_URL is not set")
+
+    try:
+        await async_sheets.warm_cache()
+        logger.info("✅ Sheets cache warmed")
+    except Exception as e:
+        logger.error(f"⚠️ Failed to warm Sheets cache: {e}")
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(handler_executor, active_polls.load)
+    except Exception as e:
+        logger.error(f"⚠️ Failed to load active polls: {e}")
+
+    job_queue.start()
+    leader_elector.start()
+    logger.info("✅ JobQueue started successfully")
+
+
+async def on_shutdown(app):
+    """Перестаємо приймати update'и й чекаємо на ті, що вже в роботі"""
+    shutdown_coordinator.accepting = False
+    if _tasks:
+        await asyncio.wait(set(_tasks), timeout=shutdown_coordinator.deadline)
+    if stats["in_flight"]:
+        logger.warning(f"⚠️ Shutdown left {stats['in_flight']} update(s) unfinished")
+
+
+async def on_cleanup(app):
+    job_queue.stop()
+    leader_elector.stop()
+    await async_telegram.close()
+    async_sheets.close()
+    handler_executor.shutdown(wait=True)
+    outbound_scheduler.stop(10)
+    logger.info("✅ Async server stopped")
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, webhook)
+    app.router.add_get("/", root)
+    app.router.add_get("/health", health_check)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/debug/traces", debug_traces)
+    app.router.add_get("/debug/profile", debug_profile)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+# ▶️ Запуск: python main_async.py
+if __name__ == "__main__":
+    web.run_app(create_app(), host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
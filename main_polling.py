@@ -0,0 +1,151 @@
+"""
+Запуск без публічного webhook.
+
+    python main_polling.py                      # long polling через getUpdates
+    python main_polling.py --record updates.jsonl
+    python main_polling.py --replay updates.jsonl [--sheets fixture.json]
+
+Режим --replay відтворює записаний лог на офлайн-таблиці (SHEETS_BACKEND=fake)
+і фейковому Bot, а наприкінці друкує пропускну здатність усього конвеєра.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Volleyball bot: long polling / replay runner")
+    parser.add_argument("--replay", help="JSONL-лог update'ів для офлайн-відтворення")
+    parser.add_argument("--sheets", help="JSON-знімок таблиці для офлайн-режиму")
+    parser.add_argument("--record", help="дописувати отримані update'и в цей JSONL-файл")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+if args.replay:
+    # Офлайн: жодних запитів до Google і спільного стану на диску
+    os.environ["SHEETS_BACKEND"] = "fake"
+    os.environ.setdefault("STATE_BACKEND", "memory")
+    if args.sheets:
+        os.environ["SHEETS_FAKE_PATH"] = args.sheets
+
+from telegram import Update
+
+from config import POLLING_TIMEOUT, POLLING_BATCH_SIZE, POLLING_OFFSET_PATH
+from bot_setup import build_bot, build_dispatcher
+from services.dedup import update_deduplicator
+from services.leader import leader_elector
+from services.outbound import outbound_scheduler
+from services.update_pool import UpdateWorkerPool
+
+# 🔧 Налаштування логування
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def load_offset(path=POLLING_OFFSET_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("offset")
+    except (OSError, ValueError):
+        return None
+
+
+def save_offset(offset, path=POLLING_OFFSET_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset, "saved_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def run_polling(record_path=None):
+    bot = build_bot()
+    dispatcher, job_queue = build_dispatcher(bot)
+    update_pool = UpdateWorkerPool(dispatcher)
+
+    bot.delete_webhook()
+    job_queue.start()
+    leader_elector.start()
+    update_pool.start()
+
+    offset = load_offset()
+    record = open(record_path, "a", encoding="utf-8") if record_path else None
+    logger.info(f"✅ Long polling started (offset={offset})")
+
+    try:
+        while True:
+            try:
+                updates = bot.get_updates(
+                    offset=offset, limit=POLLING_BATCH_SIZE, timeout=POLLING_TIMEOUT, read_latency=5
+                )
+            except Exception as e:
+                logger.error(f"❌ getUpdates failed: {e}")
+                time.sleep(3)
+                continue
+
+            if not updates:
+                continue
+
+            for update in updates:
+                if record:
+                    record.write(json.dumps(update.to_dict(), ensure_ascii=False) + "\n")
+                if not update_deduplicator.is_duplicate(update.update_id):
+                    update_pool.enqueue(update)
+
+            # Чекпоінт після всієї пачки: Telegram більше не віддасть ці update'и
+            offset = updates[-1].update_id + 1
+            save_offset(offset)
+            if record:
+                record.flush()
+    except KeyboardInterrupt:
+        logger.info("🛑 Stopping long polling")
+    finally:
+        if record:
+            record.close()
+        update_pool.stop()
+        outbound_scheduler.stop(10)
+        leader_elector.stop()
+        job_queue.stop()
+
+
+def run_replay(log_path):
+    from services.fake_telegram import FakeBot
+    from services.sheets import spreadsheet
+
+    bot = FakeBot()
+    dispatcher, job_queue = build_dispatcher(bot)
+    update_pool = UpdateWorkerPool(dispatcher)
+    update_pool.start()
+
+    with open(log_path, "r", encoding="utf-8") as f:
+        raw_updates = [json.loads(line) for line in f if line.strip()]
+
+    started = time.perf_counter()
+    for raw in raw_updates:
+        update_pool.enqueue(Update.de_json(raw, bot))
+    update_pool.wait_until_idle()
+    elapsed = time.perf_counter() - started
+    update_pool.stop()
+
+    report = {
+        "updates": len(raw_updates),
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(len(raw_updates) / elapsed, 1) if elapsed else None,
+        "pool": update_pool.stats(),
+        "telegram_calls": dict(bot.calls),
+        "sheets_calls": dict(spreadsheet.calls),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    if args.replay:
+        run_replay(args.replay)
+    else:
+        run_polling(args.record)
@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+
+from services.appeals_index import appeals_index
+from services.state_store import state_store
+
+END_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# poll_id → активний poll; спільний для всіх воркерів
+ACTIVE_NAMESPACE = "active_polls"
+ACTIVE_TTL = 7 * 24 * 3600
+
+
+class ActivePolls:
+    """
+    Активні polls у min-heap за end_time. Heap будується з 'Appeals' один раз
+    при старті; далі записи додає /appeal і прибирає закриття poll'а — як у
+    пам'яті, так і в state_store. Перевірка прострочених polls звіряє heap зі
+    state_store (polls інших воркерів) і не читає таблицю.
+    Закриті polls видаляються ліниво: запис у heap лишається, доки не дійде до вершини.
+    """
+
+    def __init__(self):
+        self._heap = []            # (end_time, seq, poll_id)
+        self._polls = {}           # poll_id → dict з даними poll'а
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def _push(self, poll):
+        self._polls[poll["poll_id"]] = poll
+        heapq.heappush(self._heap, (poll["end_time"], next(self._seq), poll["poll_id"]))
+
+    @staticmethod
+    def _to_shared(poll):
+        return dict(poll, end_time=poll["end_time"].strftime(END_TIME_FORMAT))
+
+    @staticmethod
+    def _from_shared(value):
+        try:
+            return dict(value, end_time=datetime.strptime(value["end_time"], END_TIME_FORMAT))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def load(self):
+        """Будує heap зі знімка 'Appeals' в appeals_index (один раз при старті) і ділиться ним"""
+        with self._lock:
+            self._heap, self._polls = [], {}
+            for entry in appeals_index.entries():
+                if entry["status"] != "active" or entry["chat_id"] is None or entry["message_id"] is None:
+                    continue
+                try:
+                    end_time = datetime.strptime(entry["end_time"], END_TIME_FORMAT)
+                except ValueError:
+                    continue
+                poll = {
+                    "poll_id": entry["poll_id"],
+                    "chat_id": entry["chat_id"],
+                    "message_id": entry["message_id"],
+                    "team_name": entry["team_name"],
+                    "end_time": end_time,
+                }
+                self._push(poll)
+                state_store.set(ACTIVE_NAMESPACE, poll["poll_id"], self._to_shared(poll), ttl=ACTIVE_TTL)
+            self._loaded = True
+            print(f"✅ Active polls index loaded: {len(self._polls)} active")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _sync(self):
+        """Звіряє heap зі state_store: polls інших воркерів додаються, закриті деінде — зникають"""
+        shared = {}
+        for poll_id, value in state_store.items(ACTIVE_NAMESPACE):
+            poll = self._from_shared(value)
+            if poll:
+                shared[poll_id] = poll
+        for poll_id in list(self._polls):
+            if poll_id not in shared:
+                del self._polls[poll_id]
+        for poll_id, poll in shared.items():
+            known = self._polls.get(poll_id)
+            if known is None or known["end_time"] != poll["end_time"]:
+                self._push(poll)
+
+    def add(self, poll_id, chat_id, message_id, team_name, end_time):
+        poll = {
+            "poll_id": poll_id,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "team_name": team_name,
+            "end_time": end_time,
+        }
+        with self._lock:
+            self._ensure_loaded()
+            self._push(poll)
+        state_store.set(ACTIVE_NAMESPACE, poll_id, self._to_shared(poll), ttl=ACTIVE_TTL)
+
+    def discard(self, poll_id):
+        state_store.pop(ACTIVE_NAMESPACE, poll_id)
+        with self._lock:
+            return self._polls.pop(poll_id, None)
+
+    def pop_expired(self, now=None, chat_id=None):
+        """Забирає прострочені polls (опційно лише одного чату); кожен poll отримує лише один воркер"""
+        now = now or datetime.now()
+        expired, keep = [], []
+        with self._lock:
+            self._ensure_loaded()
+            self._sync()
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                poll = self._polls.get(entry[2])
+                if poll is None or poll["end_time"] != entry[0]:
+                    continue  # закритий або перепланований
+                if chat_id is not None and poll["chat_id"] != chat_id:
+                    keep.append(entry)
+                    continue
+                del self._polls[entry[2]]
+                # Атомарний pop у state_store: той самий poll не забере інший воркер
+                if state_store.pop(ACTIVE_NAMESPACE, entry[2]) is not None:
+                    expired.append(poll)
+            for entry in keep:
+                heapq.heappush(self._heap, entry)
+        return expired
+
+    def next_end_time(self):
+        with self._lock:
+            self._ensure_loaded()
+            while self._heap and self._heap[0][2] not in self._polls:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._polls)
+
+
+active_polls = ActivePolls()
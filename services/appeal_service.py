@@ -1,41 +1,34 @@
 import uuid
 from datetime import datetime
-from collections import Counter
-
-from services.sheets import spreadsheet, teams_sheet, match_sheet, rating_sheet, appeals_sheet, mvp_results_sheet
+from collections import Counter, defaultdict
+
+from config import INITIAL_RATING
+from services.sheets import (
+    spreadsheet, match_sheet, rating_sheet, mvp_results_sheet, invalidate_cached,
+)
+from services.appeals_index import appeals_index
+from services.poll_claims import poll_claims
+from services.teams_index import teams_index
+from services.events import emit, RATINGS_CHANGED
 from services.rating_logic import get_player_games_count
+from utils.misc import to_a1
 
 
 def can_create_appeal_today(date):
     """Перевіряє, чи можна створити апеляцію сьогодні (одна на день)"""
     try:
-        all_rows = appeals_sheet.get_all_values()
-
-        if len(all_rows) <= 1:  # Тільки заголовки або пусто
-            return True
-
-        # Перевіряємо, чи є запис на сьогодні
-        for row in all_rows[1:]:
-            if len(row) >= 2 and row[1] == date:
-                return False
-
-        return True
+        # Апеляцію могли створити в іншому воркері — індекс перечитується з листа
+        appeals_index.load()
+        return not appeals_index.has_date(date)
     except Exception as e:
         print(f"Error while checking appeal eligibility: {e}")
         return False
 
 
 def is_appeal_active(date):
-    """Перевіряє, чи є активна апеляція на дату"""
+    """Перевіряє, чи є активна апеляція на дату (індекс уже оновив can_create_appeal_today)"""
     try:
-        appeals_sheet
-        all_rows = appeals_sheet.get_all_values()
-
-        for row in all_rows[1:]:
-            if len(row) >= 6 and row[1] == date and row[5] == 'active':
-                return True
-
-        return False
+        return appeals_index.has_date(date, status="active")
     except Exception as e:
         print(f"Error while checking appeal eligibility: {e}")
         return False
@@ -44,37 +37,7 @@ def is_appeal_active(date):
 def get_today_teams_and_players(date):
     """Отримує команди та їх гравців на вказану дату"""
     try:
-        all_rows = teams_sheet.get_all_values()
-        if len(all_rows) <= 1:
-            return {}
-
-        headers = all_rows[0]
-        teams_data = {}
-
-        # Шукаємо рядок з потрібною датою
-        for row in all_rows[1:]:
-            if len(row) >= 1 and row[0] == date:
-                # Перебираємо всі можливі команди (team_1, team_2, ...)
-                for i in range(1, 10):  # до 9 команд
-                    team_col = f"team_{i}"
-                    players_col = f"team_{i}_players"
-
-                    if team_col in headers and players_col in headers:
-                        team_idx = headers.index(team_col)
-                        players_idx = headers.index(players_col)
-
-                        if (team_idx < len(row) and players_idx < len(row) and
-                                row[team_idx] and row[players_idx]):
-
-                            team_name = row[team_idx].strip()
-                            players_str = row[players_idx].strip()
-
-                            if team_name and players_str:
-                                players = [p.strip() for p in players_str.split(',') if p.strip()]
-                                if players:
-                                    teams_data[team_name] = players
-
-        return teams_data
+        return {team: players for team, players in teams_index.teams_for_date(date).items() if players}
     except Exception as e:
         print(f"Error while retrieving teams and players: {e}")
         return {}
@@ -97,107 +60,185 @@ def create_appeal_record(date, teams_data):
         print(f"❌ Error creating appeal record: {e}")
         raise e
 
-def process_poll_results(poll_id, poll_results):
-    """Обробляє результати голосування після його завершення"""
-    try:
-        appeals_sheet
-        all_rows = appeals_sheet.get_all_values()
-
-        # Знаходимо рядок з цим poll_id
-        target_row_idx = None
-        team_name = None
-        date = None
-
-        for i, row in enumerate(all_rows[1:], start=2):
-            if len(row) >= 4 and row[3] == poll_id:
-                target_row_idx = i
-                team_name = row[2]
-                date = row[1]
-                break
-
-        if not target_row_idx:
+def pick_mvp(poll_results):
+    """Переможець голосування: щонайменше 6 голосів і 66%+ за одного гравця"""
+    total_votes = sum(poll_results.values())
+    if total_votes < 6:
+        return None
+    max_votes = max(poll_results.values())
+    if max_votes / total_votes * 100 < 66:
+        return None
+    for player, votes in poll_results.items():
+        if votes == max_votes:
+            return player
+
+
+def process_polls_results(results_by_poll):
+    """
+    Обробляє результати кількох закритих polls разом: бонуси MVP за кожен
+    день нараховуються одним settle_mvp_bonuses, а статуси й результати
+    всіх polls записуються в 'Appeals' одним batch_update.
+    Повертає ({poll_id: переможець або None}, {poll_id: нарахований бонус}),
+    де бонус None — нарахування не вдалося або його результат невідомий.
+    """
+    entries, winners = {}, {}
+    for poll_id, poll_results in results_by_poll.items():
+        # Рядок poll'а — з індексу 'Appeals', без читання листа
+        entry = appeals_index.get(poll_id)
+        if not entry:
             print(f"No record found for poll_id.: {poll_id}")
-            return
-
-        # Аналізуємо результати голосування
+            continue
+        entries[poll_id] = entry
+        winners[poll_id] = pick_mvp(poll_results)
+
+    # Позначка ставиться до запису в 'Rating': після збою посеред фіналізації
+    # перезапущена job не нарахує бонус удруге (щонайбільше один раз)
+    fresh, settled = poll_claims.mark_settled([poll_id for poll_id, winner in winners.items() if winner])
+    for poll_id, bonus in settled.items():
+        print(f"⚠️ MVP bonus for poll {poll_id} was already settled ({bonus}), skipping")
+
+    polls_by_date = defaultdict(list)
+    for poll_id in fresh:
+        polls_by_date[entries[poll_id]["date"]].append(poll_id)
+
+    poll_bonuses = {poll_id: bonus if isinstance(bonus, int) else None for poll_id, bonus in settled.items()}
+    for date, poll_ids in polls_by_date.items():
+        try:
+            date_bonuses = settle_mvp_bonuses(date, [winners[poll_id] for poll_id in poll_ids])
+        except Exception as e:
+            print(f"Error while applying bonus points.: {e}")
+            # Бонус не записано — знімаємо позначку, щоб повторна обробка могла його нарахувати
+            poll_claims.release_settled(poll_ids)
+            poll_bonuses.update({poll_id: None for poll_id in poll_ids})
+            continue
+        for poll_id in poll_ids:
+            poll_bonuses[poll_id] = date_bonuses.get(winners[poll_id], 0)
+            poll_claims.record_bonus(poll_id, poll_bonuses[poll_id])
+
+    changes = {}
+    for poll_id, winner in winners.items():
+        poll_results = results_by_poll[poll_id]
         total_votes = sum(poll_results.values())
+        max_votes = max(poll_results.values()) if poll_results else 0
 
         if total_votes < 6:
-            # Недостатньо голосів
             result_text = f"insufficient_votes_{total_votes}"
-            appeals_sheet.update_cell(target_row_idx, 7, 'completed')  # status
-            appeals_sheet.update_cell(target_row_idx, 9, result_text)  # results
-            return
-
-        # Перевіряємо, чи є гравець з 66%+ голосів
-        winner = None
-        max_votes = max(poll_results.values())
-        win_percentage = (max_votes / total_votes) * 100
-
-        if win_percentage >= 66:
-            # Знаходимо переможця
-            for player, votes in poll_results.items():
-                if votes == max_votes:
-                    winner = player
-                    break
-
-        if winner:
-            # Нараховуємо бонусні бали
-            bonus_applied = apply_bonus_rating(winner, date)
-            result_text = f"winner_{winner}_votes_{max_votes}_total_{total_votes}_bonus_{bonus_applied}"
+        elif winner:
+            bonus_applied = poll_bonuses.get(poll_id)
+            bonus_text = "failed" if bonus_applied is None else bonus_applied
+            result_text = f"winner_{winner}_votes_{max_votes}_total_{total_votes}_bonus_{bonus_text}"
         else:
+            win_percentage = (max_votes / total_votes) * 100
             result_text = f"no_winner_max_{max_votes}_total_{total_votes}_percent_{win_percentage:.1f}"
+        changes[poll_id] = ('completed', result_text)
 
-        # Оновлюємо статус та результати
-        appeals_sheet.update_cell(target_row_idx, 6, 'completed')  # status
-        appeals_sheet.update_cell(target_row_idx, 7, result_text)  # results
-
-        return winner
-
+    try:
+        appeals_index.set_statuses(changes)
     except Exception as e:
         print(f"Error while processing poll results: {e}")
-        return None
-
 
-def apply_bonus_rating(player_name, date):
-    """Застосовує бонусні бали до рейтингу гравця"""
-    try:
-        # Отримуємо кількість матчів, зіграних гравцем сьогодні
-        matches_today = get_player_matches_today(player_name, date)
+    return winners, {poll_id: poll_bonuses.get(poll_id) for poll_id, winner in winners.items() if winner}
 
-        if matches_today == 0:
-            return 0
 
-        bonus_points = 3 * matches_today
+def process_poll_results(poll_id, poll_results):
+    """Обробляє результати голосування після його завершення"""
+    try:
+        winners, _ = process_polls_results({poll_id: poll_results})
+        return winners.get(poll_id)
+    except Exception as e:
+        print(f"Error while processing poll results: {e}")
+        return None
 
-        # Оновлюємо рейтинг у таблиці Rating
-        rating_rows = rating_sheet.get_all_values()
-        headers = rating_rows[0]
 
-        # Знаходимо колонку гравця
-        player_col_idx = None
-        for i, header in enumerate(headers):
-            if header.strip() == player_name:
-                player_col_idx = i
-                break
+def _header_positions(headers):
+    return {header.strip().lower(): idx for idx, header in enumerate(headers)}
 
-        if player_col_idx is None:
-            print(f"Player {player_name} didn't find in the rating sheet.")
-            return 0
 
-        # Знаходимо останній рядок з рейтингом
-        last_row_idx = len(rating_rows)
-        current_rating = rating_rows[-1][player_col_idx] if rating_rows[-1][player_col_idx] else 1500
-        new_rating = int(current_rating) + bonus_points
+def get_matches_played(date, matches_rows=None):
+    """
+    {гравець: кількість матчів за дату} за один прохід: склади команд дня
+    з teams_index, потім кожен матч дня з 'Matches' зараховується обом складам.
+    """
+    matches_rows = matches_rows if matches_rows is not None else match_sheet.get_all_values()
+    if len(matches_rows) <= 1:
+        return {}
+    rosters = teams_index.teams_for_date(date)
+    if not rosters:
+        return {}
 
-        # Оновлюємо рейтинг
-        rating_sheet.update_cell(last_row_idx, player_col_idx + 1, new_rating)
+    match_cols = _header_positions(matches_rows[0])
+    m_date, m_team1, m_team2 = match_cols.get("date", 1), match_cols.get("team1", 3), match_cols.get("team2", 4)
+    played = Counter()
+    for row in matches_rows[1:]:
+        if len(row) <= max(m_date, m_team1, m_team2) or row[m_date] != date:
+            continue
+        for team in {row[m_team1].strip(), row[m_team2].strip()}:
+            played.update(set(rosters.get(team, [])))
+    return dict(played)
+
+
+def settle_mvp_bonuses(date, winners):
+    """
+    Нараховує бонуси MVP усім переможцям дня разом: матчі дня читаються
+    один раз, з 'Rating' — лише заголовок і останній рядок, усі нові
+    рейтинги пишуться одним batch_update в останній
+    рядок 'Rating', а записи 'MVP Results' — одним append_rows.
+    Повертає {гравець: бонус}.
+    """
+    winners = list(dict.fromkeys(winners))
+    if not winners:
+        return {}
 
-        # Записуємо інформацію в MVP Results
-        save_mvp_result(player_name, date, matches_today, bonus_points, current_rating, new_rating)
+    played = get_matches_played(date)
+    bonuses = {player: 3 * played.get(player, 0) for player in winners}
+    bonuses = {player: bonus for player, bonus in bonuses.items() if bonus > 0}
+    if not bonuses:
+        return {player: 0 for player in winners}
+
+    # Лише заголовок і останній рядок 'Rating': номер рядка — за колонкою match_id
+    last_row_idx = len(rating_sheet.col_values(1))
+    if last_row_idx < 2:
+        print("Rating sheet has no rating rows yet.")
+        return {player: 0 for player in winners}
+
+    header_range, last_range = rating_sheet.batch_get(["1:1", f"{last_row_idx}:{last_row_idx}"])
+    headers = [header.strip() for header in (header_range[0] if header_range else [])]
+    last_row = last_range[0] if last_range else []
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    rating_updates, mvp_rows, applied = [], [], {}
+    for player, bonus_points in bonuses.items():
+        if player not in headers:
+            print(f"Player {player} didn't find in the rating sheet.")
+            continue
+        col_idx = headers.index(player)
+        try:
+            current_rating = int(float(last_row[col_idx])) if col_idx < len(last_row) and last_row[col_idx] else INITIAL_RATING
+        except ValueError:
+            current_rating = INITIAL_RATING
+        new_rating = current_rating + bonus_points
+
+        rating_updates.append({"range": to_a1(last_row_idx, col_idx + 1), "values": [[new_rating]]})
+        mvp_rows.append([date, player, played[player], bonus_points, current_rating, new_rating, timestamp])
+        applied[player] = bonus_points
+
+    if rating_updates:
+        rating_sheet.batch_update(rating_updates)
+        invalidate_cached("ratings")
+        # Рейтинг уже записано: збій журналу 'MVP Results' не скасовує нарахування
+        try:
+            mvp_results_sheet.append_rows(mvp_rows)
+        except Exception as e:
+            print(f"❌ Failed to log MVP results for {date}: {e}")
+        emit(RATINGS_CHANGED, players=sorted(applied), match_id=None)
+
+    return {player: applied.get(player, 0) for player in winners}
 
-        return bonus_points
 
+def apply_bonus_rating(player_name, date):
+    """Застосовує бонусні бали до рейтингу гравця"""
+    try:
+        return settle_mvp_bonuses(date, [player_name]).get(player_name, 0)
     except Exception as e:
         print(f"Error while applying bonus points.: {e}")
         return 0
@@ -206,48 +247,7 @@ def apply_bonus_rating(player_name, date):
 def get_player_matches_today(player_name, date):
     """Отримує кількість матчів, зіграних гравцем сьогодні"""
     try:
-        matches_rows = match_sheet.get_all_values()
-        teams_rows = teams_sheet.get_all_values()
-
-        if len(matches_rows) <= 1 or len(teams_rows) <= 1:
-            return 0
-
-        matches_today = 0
-
-        # Перевіряємо кожен матч сьогодні
-        for match_row in matches_rows[1:]:
-            if len(match_row) >= 2 and match_row[1] == date:
-                # Знаходимо команди для цього матчу
-                for team_row in teams_rows[1:]:
-                    if len(team_row) >= 6 and team_row[0] == date:
-                        team1_players = [p.strip() for p in team_row[2].split(',') if p.strip()]
-                        team2_players = [p.strip() for p in team_row[5].split(',') if p.strip()]
-
-                        if player_name in team1_players or player_name in team2_players:
-                            matches_today += 1
-                            break
-
-        return matches_today
-
+        return get_matches_played(date).get(player_name, 0)
     except Exception as e:
         print(f"Error while counting player's matches: {e}")
         return 0
-
-
-def save_mvp_result(player_name, date, matches_count, bonus_points, old_rating, new_rating):
-    """Зберігає результат MVP у таблицю MVP Results"""
-    try:
-        # Додаємо новий запис
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        mvp_results_sheet.append_row([
-            date,
-            player_name,
-            matches_count,
-            bonus_points,
-            old_rating,
-            new_rating,
-            timestamp
-        ])
-
-    except Exception as e:
-        print(f"Error while counting player's matches: {e}")
\ No newline at end of file
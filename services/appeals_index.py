@@ -0,0 +1,176 @@
+import re
+import threading
+
+from services.sheets import appeals_sheet
+from utils.misc import to_a1
+
+# Колонки 'Appeals' у порядку, в якому /appeal записує рядок
+APPEAL_COLUMNS = ["appeal_id", "date", "team_name", "poll_id", "message_id", "chat_id", "status", "end_time", "results"]
+
+
+def _appended_row(response):
+    """Номер першого доданого рядка з відповіді values.append (updates.updatedRange)"""
+    try:
+        updated_range = response["updates"]["updatedRange"]
+        return int(re.search(r"[A-Z]+(\d+)", updated_range.split("!")[-1]).group(1))
+    except (TypeError, KeyError, AttributeError, ValueError):
+        return None
+
+
+class AppealsIndex:
+    """
+    poll_id → рядок 'Appeals' (номер рядка, chat_id, команда, дата, статус...).
+    Будується з одного знімка листа з позиціями колонок за заголовками,
+    далі підтримується при додаванні рядків і зміні статусу — закриття
+    poll'а не читає таблицю. Невідомий poll_id (напр. створений іншим
+    воркером) один раз перечитує лист.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.polls = {}
+        self.row_count = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        rows = appeals_sheet.get_all_values()
+        with self._lock:
+            headers = rows[0] if rows else APPEAL_COLUMNS
+            self.columns = {header.strip().lower(): idx for idx, header in enumerate(headers)}
+            previous, self.polls = self.polls, {}
+            for row_number, row in enumerate(rows[1:], start=2):
+                entry = self._parse(row, row_number)
+                if entry:
+                    # 'closing' живе лише в пам'яті (claim цього процесу) — перечитування його не скидає
+                    known = previous.get(entry["poll_id"])
+                    if known and known["status"] == "closing" and entry["status"] == "active":
+                        entry["status"] = "closing"
+                    self.polls[entry["poll_id"]] = entry
+            self.row_count = max(len(rows), 1)
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _parse(self, row, row_number):
+        def cell(name):
+            idx = self.columns.get(name)
+            return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+        poll_id = cell("poll_id")
+        if not poll_id:
+            return None
+        entry = {name: cell(name) for name in APPEAL_COLUMNS}
+        entry["row"] = row_number
+        for name in ("chat_id", "message_id"):
+            try:
+                entry[name] = int(entry[name])
+            except ValueError:
+                entry[name] = None
+        return entry
+
+    def get(self, poll_id, reload_missing=True):
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.polls.get(poll_id)
+        if entry is None and reload_missing:
+            self.load()
+            with self._lock:
+                entry = self.polls.get(poll_id)
+        return dict(entry) if entry else None
+
+    def entries(self):
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(entry) for entry in self.polls.values()]
+
+    def has_date(self, date, status=None):
+        return any(
+            entry["date"] == date and (status is None or entry["status"] == status)
+            for entry in self.entries()
+        )
+
+    def to_row(self, values):
+        """dict колонка → значення у рядок за фактичними позиціями заголовків"""
+        with self._lock:
+            self._ensure_loaded()
+            width = max(self.columns.values()) + 1 if self.columns else len(APPEAL_COLUMNS)
+            row = [""] * width
+            for name, value in values.items():
+                idx = self.columns.get(name)
+                if idx is not None:
+                    row[idx] = value
+            return row
+
+    def append(self, values_list, response=None):
+        """Реєструє рядки, щойно додані в лист одним append_rows; response — його відповідь"""
+        with self._lock:
+            self._ensure_loaded()
+            first_row = _appended_row(response) or self.row_count + 1
+            entries = []
+            for offset, values in enumerate(values_list):
+                row = [str(v) for v in self.to_row(values)]
+                entry = self._parse(row, first_row + offset)
+                if entry:
+                    self.polls[entry["poll_id"]] = entry
+                    entries.append(entry)
+            self.row_count = max(self.row_count, first_row + len(values_list) - 1)
+            return entries
+
+    def transition(self, poll_id, expected, status, reload_missing=True):
+        """
+        Атомарна зміна статусу лише в індексі (expected → status), без запису в лист.
+        Використовується як claim: з 'active' у 'closing' переходить лише один тригер.
+        Невідомий poll_id, як і в get(), один раз перечитує лист.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if poll_id not in self.polls and reload_missing:
+                self.load()
+            entry = self.polls.get(poll_id)
+            if entry is None or entry["status"] != expected:
+                return False
+            entry["status"] = status
+            return True
+
+    def set_status(self, poll_id, status, results=None):
+        """
+        Статус (і результат) poll'а одним batch_update без читання листа.
+        Повертає False, якщо poll невідомий або нічого не змінилося.
+        """
+        return self.set_statuses({poll_id: (status, results)})
+
+    def set_statuses(self, changes):
+        """{poll_id: (status, results | None)} — усі зміни одним batch_update"""
+        data, applied = [], {}
+        for poll_id, (status, results) in changes.items():
+            entry = self.get(poll_id)
+            if entry is None:
+                print(f"⚠️ Poll {poll_id} not found in Appeals sheet")
+                continue
+
+            updates = {"status": status}
+            if results is not None:
+                updates["results"] = results
+            updates = {name: value for name, value in updates.items() if entry.get(name) != value}
+            for name, value in updates.items():
+                if name in self.columns:
+                    data.append({"range": to_a1(entry["row"], self.columns[name] + 1), "values": [[value]]})
+            if updates:
+                applied[poll_id] = updates
+
+        if not data:
+            return False
+
+        appeals_sheet.batch_update(data)
+        with self._lock:
+            for poll_id, updates in applied.items():
+                current = self.polls.get(poll_id)
+                if current:
+                    current.update(updates)
+        return True
+
+
+appeals_index = AppealsIndex()
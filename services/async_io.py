@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from requests.adapters import HTTPAdapter
+
+from config import BOT_TOKEN, ASYNC_SHEETS_CONCURRENCY
+from services import sheets
+
+
+class AsyncWorksheet:
+    """Async-обгортка над gspread Worksheet: виклики йдуть у пул потоків"""
+
+    def __init__(self, worksheet, io):
+        self._worksheet = worksheet
+        self._io = io
+
+    def __getattr__(self, name):
+        method = getattr(self._worksheet, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return await self._io.run(method, *args, **kwargs)
+
+        return call
+
+
+class AsyncSheets:
+    """
+    Доступ до Google Sheets з asyncio. gspread синхронний, тож кожен виклик
+    виконується у виділеному пулі, обмеженому семафором. Усі воркшити
+    ділять одну HTTP-сесію клієнта з розширеним пулом з'єднань.
+    """
+
+    def __init__(self, concurrency=ASYNC_SHEETS_CONCURRENCY):
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="sheets-io")
+        self._semaphore = None
+        self._concurrency = concurrency
+        if sheets.client is not None:
+            adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+            sheets.client.session.mount("https://", adapter)
+
+        self.matches = AsyncWorksheet(sheets.match_sheet, self)
+        self.teams = AsyncWorksheet(sheets.teams_sheet, self)
+
+    async def run(self, fn, *args, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def warm_cache(self):
+        """Паралельно підвантажує Matches і Teams у спільний кеш (sheets.put_cached)"""
+        matches_rows, teams_rows = await asyncio.gather(
+            self.matches.get_all_values(),
+            self.teams.get_all_values(),
+        )
+        sheets.put_cached("matches_rows", matches_rows)
+        sheets.put_cached("teams_rows", teams_rows)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class TelegramAPIError(Exception):
+    pass
+
+
+class AsyncTelegram:
+    """
+    Мінімальний async-клієнт Bot API на одній спільній aiohttp-сесії — для
+    службових викликів сервера (setWebhook). Відповіді хендлерів ідуть через
+    outbound_scheduler, бо хендлери PTB синхронні.
+    """
+
+    def __init__(self, token=BOT_TOKEN):
+        self._base_url = f"https://api.telegram.org/bot{token}"
+        self._session = None
+
+    async def start(self):
+        import aiohttp
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def call(self, method, **params):
+        await self.start()
+        async with self._session.post(f"{self._base_url}/{method}", json=params) as response:
+            data = await response.json()
+        if not data.get("ok"):
+            raise TelegramAPIError(data.get("description", f"{method} failed"))
+        return data.get("result")
+
+    async def set_webhook(self, url):
+        return await self.call("setWebhook", url=url)
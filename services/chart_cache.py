@@ -0,0 +1,214 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config import CHART_CACHE_SIZE, CHART_CACHE_DIR, CHART_PROFILE
+from services.metrics import cache_requests, chart_render_seconds
+from services.rating_logic import (
+    create_rating_chart,
+    get_weekly_rating_series,
+    get_player_rating_history,
+    get_players_rating_history,
+)
+
+
+def get_rating_version(history):
+    """
+    Версія графіка гравця: хеш тижневих точок, що потрапляють на графік.
+    Змінюється лише коли новий/видалений рядок Rating зачіпає цього гравця.
+    """
+    labels, values = get_weekly_rating_series(history)
+    digest = hashlib.sha1()
+    for label, value in zip(labels, values):
+        digest.update(f"{label}={value:.4f};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ChartCache:
+    """LRU кеш PNG-графіків у пам'яті з опціональним дисковим рівнем"""
+
+    def __init__(self, max_entries=CHART_CACHE_SIZE, cache_dir=CHART_CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # (player, profile) → (version, file_id) — лише остання версія графіка гравця
+        self._file_ids = {}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_file_ids()
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.png")
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                cache_requests.inc(cache="chart", result="hit")
+                return data
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+                self._remember(key, data)
+                self.hits += 1
+                cache_requests.inc(cache="chart", result="disk_hit")
+                return data
+            except OSError:
+                pass
+
+        self.misses += 1
+        cache_requests.inc(cache="chart", result="miss")
+        return None
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ Failed to write chart cache file: {e}")
+
+    # --- Telegram file_id ---
+
+    def _file_ids_path(self):
+        return os.path.join(self.cache_dir, "file_ids.json")
+
+    def _load_file_ids(self):
+        try:
+            with open(self._file_ids_path(), "r", encoding="utf-8") as f:
+                for item in json.load(f):
+                    self._file_ids[(item["player"], item["profile"])] = (item["version"], item["file_id"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_file_ids(self):
+        if not self.cache_dir:
+            return
+        items = [
+            {"player": player, "profile": profile, "version": version, "file_id": file_id}
+            for (player, profile), (version, file_id) in self._file_ids.items()
+        ]
+        try:
+            tmp_path = f"{self._file_ids_path()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(items, f, ensure_ascii=False)
+            os.replace(tmp_path, self._file_ids_path())
+        except OSError as e:
+            print(f"⚠️ Failed to save chart file_ids: {e}")
+
+    def get_file_id(self, key):
+        player, version, profile = key
+        with self._lock:
+            stored = self._file_ids.get((player, profile))
+        if stored and stored[0] == version:
+            self.hits += 1
+            cache_requests.inc(cache="chart_file_id", result="hit")
+            return stored[1]
+        cache_requests.inc(cache="chart_file_id", result="miss")
+        return None
+
+    def remember_file_id(self, key, file_id):
+        player, version, profile = key
+        with self._lock:
+            self._file_ids[(player, profile)] = (version, file_id)
+            self._save_file_ids()
+
+    def forget_file_id(self, key):
+        player, _, profile = key
+        with self._lock:
+            if self._file_ids.pop((player, profile), None):
+                self._save_file_ids()
+
+
+chart_cache = ChartCache()
+
+
+def get_chart_key(player_name, history, profile=None):
+    return player_name, get_rating_version(history), profile or CHART_PROFILE
+
+
+def get_rating_chart(player_name, history, profile=None):
+    """Повертає BytesIO з графіком, рендерить лише якщо версії ще немає в кеші"""
+    if not history:
+        return None
+
+    key = get_chart_key(player_name, history, profile)
+    profile = key[2]
+
+    data = chart_cache.get(key)
+    if data is None:
+        with chart_render_seconds.time(profile=profile):
+            buf = create_rating_chart(player_name, history, profile)
+        if buf is None:
+            return None
+        data = buf.getvalue()
+        chart_cache.put(key, data)
+
+    return io.BytesIO(data)
+
+
+def load_rating_chart(player_name, profile=None, reuse_file_id=True):
+    """
+    Читає історію з 'Rating' (для запуску в пулі рендеру) і повертає (key, photo).
+    photo — file_id Telegram, якщо ця версія вже завантажувалась, інакше BytesIO.
+    """
+    history = get_player_rating_history(player_name)
+    if not history:
+        return None, None
+
+    key = get_chart_key(player_name, history, profile)
+    if reuse_file_id:
+        file_id = chart_cache.get_file_id(key)
+        if file_id:
+            return key, file_id
+    return key, get_rating_chart(player_name, history, profile)
+
+
+def prerender_rating_charts(player_names, bot=None, upload_chat_id=None, profile=None):
+    """
+    Прогріває кеш графіків для гравців, чий рейтинг щойно змінився.
+    Якщо задано upload_chat_id, одразу завантажує графік у Telegram і запам'ятовує file_id.
+    """
+    histories = get_players_rating_history(player_names)
+    rendered = 0
+
+    for player, history in histories.items():
+        if not history:
+            continue
+        key = get_chart_key(player, history, profile)
+        photo = get_rating_chart(player, history, profile)
+        if not photo:
+            continue
+        rendered += 1
+
+        if bot and upload_chat_id and not chart_cache.get_file_id(key):
+            try:
+                message = bot.send_photo(chat_id=upload_chat_id, photo=photo, disable_notification=True)
+                if message.photo:
+                    chart_cache.remember_file_id(key, message.photo[-1].file_id)
+            except Exception as e:
+                print(f"⚠️ Failed to pre-upload chart for {player}: {e}")
+
+    return rendered
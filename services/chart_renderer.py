@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CHART_RENDER_WORKERS, CHART_RENDER_TIMEOUT
+
+# Окремий пул для рендеру графіків, щоб не тримати потік webhook/dispatcher
+render_pool = ThreadPoolExecutor(max_workers=CHART_RENDER_WORKERS, thread_name_prefix="chart-render")
+
+
+def submit_render(fn, *args, on_ready, on_failure, timeout=CHART_RENDER_TIMEOUT):
+    """
+    Запускає fn(*args) у пулі рендеру. Рівно один з колбеків буде викликано:
+    on_ready(result) після завершення або on_failure(error) при помилці/таймауті.
+    Результат, що прийшов після таймауту, просто лишається в кеші графіків.
+    """
+    state = {"settled": False}
+    lock = threading.Lock()
+
+    def settle():
+        with lock:
+            if state["settled"]:
+                return False
+            state["settled"] = True
+            return True
+
+    def on_timeout():
+        if settle():
+            future.cancel()
+            _safe_call(on_failure, TimeoutError(f"render did not finish in {timeout}s"))
+
+    def on_done(fut):
+        if not settle():
+            return
+        timer.cancel()
+        if fut.cancelled():
+            return
+        error = fut.exception()
+        if error is not None:
+            _safe_call(on_failure, error)
+        else:
+            _safe_call(on_ready, fut.result())
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.daemon = True
+    future = render_pool.submit(fn, *args)
+    timer.start()
+    future.add_done_callback(on_done)
+    return future
+
+
+def _safe_call(callback, value):
+    try:
+        callback(value)
+    except Exception as e:
+        print(f"⚠️ Chart render callback failed: {e}")
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config import UPDATE_DEDUP_WINDOW, UPDATE_DEDUP_SIZE, UPDATE_DEDUP_DB
+from services.state_store import state_store
+
+# update_id, які вже взяв у роботу якийсь воркер
+SHARED_NAMESPACE = "seen_updates"
+
+
+class UpdateDeduplicator:
+    """
+    Пам'ятає нещодавні update_id, щоб не обробляти повторні доставки Telegram.
+    Обмежений за часом (window) і розміром; між воркерами — lease у state_store,
+    опціонально дублюється в SQLite, щоб пережити перезапуск процесу.
+    """
+
+    def __init__(self, window=UPDATE_DEDUP_WINDOW, max_size=UPDATE_DEDUP_SIZE, db_path=UPDATE_DEDUP_DB):
+        self.window = window
+        self.max_size = max_size
+        self._seen = OrderedDict()  # update_id → час першої появи
+        self._lock = threading.Lock()
+        self._db = None
+        self.duplicates = 0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS seen_updates (update_id INTEGER PRIMARY KEY, seen_at REAL)"
+            )
+            cutoff = time.time() - self.window
+            self._db.execute("DELETE FROM seen_updates WHERE seen_at < ?", (cutoff,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT update_id, seen_at FROM seen_updates ORDER BY seen_at DESC LIMIT ?", (self.max_size,)
+            ).fetchall()
+            for update_id, seen_at in reversed(rows):
+                self._seen[update_id] = seen_at
+        except sqlite3.Error as e:
+            print(f"⚠️ Update de-dup store unavailable, using memory only: {e}")
+            self._db = None
+
+    def _evict(self, now):
+        cutoff = now - self.window
+        while self._seen:
+            update_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff and len(self._seen) <= self.max_size:
+                break
+            self._seen.popitem(last=False)
+
+    def is_duplicate(self, update_id, shared=True):
+        """
+        True, якщо update_id вже бачили (цей процес або, з shared, інший воркер);
+        інакше запам'ятовує його. shared=False — лише пам'ять процесу; спільну
+        перевірку тоді робить is_shared_duplicate() (asyncio-сервер виконує її
+        поза циклом подій).
+        """
+        if update_id is None:
+            return False
+        now = time.time()
+        with self._lock:
+            if update_id in self._seen:
+                self.duplicates += 1
+                return True
+            self._seen[update_id] = now
+            self._evict(now)
+        if shared:
+            return self.is_shared_duplicate(update_id, now)
+        return False
+
+    def is_shared_duplicate(self, update_id, seen_at=None):
+        """
+        Повторна доставка могла потрапити на інший воркер: update_id бере
+        lease у state_store на вікно de-dup — лише перший воркер його отримує.
+        """
+        seen_at = seen_at or time.time()
+        if not state_store.acquire_lease(SHARED_NAMESPACE, update_id, uuid.uuid4().hex, self.window):
+            with self._lock:
+                self.duplicates += 1
+            return True
+        self._persist(update_id, seen_at)
+        return False
+
+    def _persist(self, update_id, seen_at):
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO seen_updates (update_id, seen_at) VALUES (?, ?)", (update_id, seen_at)
+                )
+                self._db.execute("DELETE FROM seen_updates WHERE seen_at < ?", (seen_at - self.window,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Failed to persist update_id {update_id}: {e}")
+
+
+update_deduplicator = UpdateDeduplicator()
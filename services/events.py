@@ -0,0 +1,23 @@
+import threading
+from collections import defaultdict
+
+# Прості внутрішньопроцесні події: сервіси повідомляють, main.py підписується
+RATINGS_CHANGED = "ratings_changed"
+
+_subscribers = defaultdict(list)
+_lock = threading.Lock()
+
+
+def subscribe(event, callback):
+    with _lock:
+        _subscribers[event].append(callback)
+
+
+def emit(event, **payload):
+    with _lock:
+        callbacks = list(_subscribers.get(event, ()))
+    for callback in callbacks:
+        try:
+            callback(**payload)
+        except Exception as e:
+            print(f"⚠️ Event handler for {event} failed: {e}")
@@ -0,0 +1,203 @@
+import copy
+import json
+import re
+import threading
+from collections import Counter
+
+# Заголовки, як у робочій таблиці
+DEFAULT_HEADERS = {
+    "Final Score": ["Player Name", "Rating for Team Matching", "is_ready"],
+    "Rating": ["match_id", "date"],
+    "Matches": ["match_id", "date", "match_number", "team1", "team2", "score1", "score2", "winner"],
+    "Teams": ["date"] + [
+        col for i in range(1, 10)
+        for col in (f"team_{i}", f"team_{i}_players", f"avg_rate_team_{i}")
+    ],
+    "Appeals": ["appeal_id", "date", "team_name", "poll_id", "message_id", "chat_id", "status", "end_time", "results"],
+    "MVP Results": ["date", "player_name", "matches", "bonus_points", "old_rating", "new_rating", "timestamp"],
+}
+
+
+def _col_to_index(letters):
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index
+
+
+def _parse_range(range_name):
+    """'1:1' → (1, 1, 1, None); 'C:C' → (1, 3, None, 3); 'B2:C3' / 'B2' → (row1, col1, row2, col2)"""
+    range_name = range_name.split("!")[-1]
+    cols_only = re.fullmatch(r"([A-Za-z]+):([A-Za-z]+)", range_name)
+    if cols_only:
+        return 1, _col_to_index(cols_only.group(1)), None, _col_to_index(cols_only.group(2))
+    rows_only = re.fullmatch(r"(\d+):(\d+)", range_name)
+    if rows_only:
+        return int(rows_only.group(1)), 1, int(rows_only.group(2)), None
+    cells = re.fullmatch(r"([A-Za-z]+)(\d+)(?::([A-Za-z]+)(\d+))?", range_name)
+    if not cells:
+        raise ValueError(f"Unsupported range: {range_name}")
+    row1, col1 = int(cells.group(2)), _col_to_index(cells.group(1))
+    if cells.group(3):
+        return row1, col1, int(cells.group(4)), _col_to_index(cells.group(3))
+    return row1, col1, row1, col1
+
+
+def _to_record_value(value):
+    try:
+        number = float(value)
+        return int(number) if number.is_integer() else number
+    except (TypeError, ValueError):
+        return value
+
+
+class FakeWorksheet:
+    """
+    Офлайн-замінник gspread Worksheet для відтворення логів і бенчмарків.
+    Підтримує лише методи, які використовує бот, і рахує кожен виклик.
+    """
+
+    def __init__(self, title, rows, calls):
+        self.title = title
+        self._rows = [[str(v) for v in row] for row in rows]
+        self._calls = calls
+        self._lock = threading.Lock()
+
+    def _count(self, method):
+        self._calls[f"{self.title}.{method}"] += 1
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    def get_all_values(self, **kwargs):
+        self._count("get_all_values")
+        with self._lock:
+            return copy.deepcopy(self._rows)
+
+    def get_all_records(self):
+        self._count("get_all_records")
+        with self._lock:
+            if not self._rows:
+                return []
+            headers = self._rows[0]
+            return [
+                {h: _to_record_value(row[i]) if i < len(row) else "" for i, h in enumerate(headers)}
+                for row in self._rows[1:]
+            ]
+
+    def row_values(self, row):
+        self._count("row_values")
+        with self._lock:
+            return list(self._rows[row - 1]) if row <= len(self._rows) else []
+
+    def col_values(self, col):
+        self._count("col_values")
+        with self._lock:
+            return [row[col - 1] for row in self._rows if col <= len(row)]
+
+    def batch_get(self, ranges, **kwargs):
+        """Як values.batchGet: порожні клітинки й рядки в кінці обрізаються"""
+        self._count("batch_get")
+        result = []
+        with self._lock:
+            for range_name in ranges:
+                row1, col1, row2, col2 = _parse_range(range_name)
+                rows = self._rows[row1 - 1:row2]
+                values = []
+                for row in rows:
+                    cells = row[col1 - 1:col2]
+                    while cells and not cells[-1]:
+                        cells = cells[:-1]
+                    values.append(list(cells))
+                while values and not values[-1]:
+                    values.pop()
+                result.append(values)
+        return result
+
+    def _append(self, rows):
+        """Як values.append у Sheets API: відповідь з updates.updatedRange"""
+        first = len(self._rows) + 1
+        self._rows.extend([str(v) for v in row] for row in rows)
+        width = max((len(row) for row in rows), default=1)
+        end_col = ""
+        col = width
+        while col:
+            col, rem = divmod(col - 1, 26)
+            end_col = chr(ord("A") + rem) + end_col
+        return {"updates": {
+            "updatedRange": f"'{self.title}'!A{first}:{end_col}{len(self._rows)}",
+            "updatedRows": len(rows),
+        }}
+
+    def append_row(self, values, **kwargs):
+        self._count("append_row")
+        with self._lock:
+            return self._append([values])
+
+    def append_rows(self, values, **kwargs):
+        self._count("append_rows")
+        with self._lock:
+            return self._append(list(values))
+
+    def _set_cell(self, row, col, value):
+        while len(self._rows) < row:
+            self._rows.append([])
+        target = self._rows[row - 1]
+        while len(target) < col:
+            target.append("")
+        target[col - 1] = str(value)
+
+    def _write_range(self, range_name, values):
+        row1, col1, _, _ = _parse_range(range_name)
+        for r_offset, row_values in enumerate(values):
+            for c_offset, value in enumerate(row_values):
+                self._set_cell(row1 + r_offset, col1 + c_offset, value)
+
+    def update(self, range_name, values=None, **kwargs):
+        self._count("update")
+        with self._lock:
+            self._write_range(range_name, values or [])
+
+    def batch_update(self, data, **kwargs):
+        self._count("batch_update")
+        with self._lock:
+            for item in data:
+                self._write_range(item["range"], item["values"])
+
+    def update_cell(self, row, col, value):
+        self._count("update_cell")
+        with self._lock:
+            self._set_cell(row, col, value)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._count("delete_rows")
+        with self._lock:
+            del self._rows[start_index - 1:(end_index or start_index)]
+
+
+class FakeSpreadsheet:
+    def __init__(self, data=None):
+        self.calls = Counter()
+        data = data or {}
+        self._worksheets = {
+            title: FakeWorksheet(title, data.get(title, [headers]), self.calls)
+            for title, headers in DEFAULT_HEADERS.items()
+        }
+        for title, rows in data.items():
+            if title not in self._worksheets:
+                self._worksheets[title] = FakeWorksheet(title, rows, self.calls)
+
+    @classmethod
+    def load(cls, path=None):
+        """path — JSON {"Назва листа": [[рядок], ...]}; без нього — порожні листи з заголовками"""
+        if not path:
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def worksheet(self, title):
+        return self._worksheets[title]
+
+    def dump(self):
+        return {title: ws._rows for title, ws in self._worksheets.items()}
@@ -0,0 +1,71 @@
+import itertools
+import threading
+import time
+from collections import Counter
+
+from telegram import Bot
+
+
+class FakeBot(Bot):
+    """
+    Bot без мережі для відтворення логів: кожен виклик Bot API
+    повертає правдоподібну відповідь і лише рахується.
+    """
+
+    def __init__(self, token="123456:replay"):
+        super().__init__(token=token)
+        self.calls = Counter()
+        self._ids = itertools.count(1)
+        self._polls = {}
+        self._lock = threading.Lock()
+
+    def _fake_message(self, chat_id, **extra):
+        message = {
+            "message_id": next(self._ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if chat_id is not None else 0, "type": "group"},
+        }
+        message.update(extra)
+        return message
+
+    def _post(self, endpoint, data=None, timeout=None, api_kwargs=None):
+        data = data or {}
+        with self._lock:
+            self.calls[endpoint] += 1
+
+        if endpoint == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "ReplayBot", "username": "replay_bot"}
+        if endpoint in ("sendMessage", "editMessageText"):
+            return self._fake_message(data.get("chat_id"), text=data.get("text", ""))
+        if endpoint == "sendPhoto":
+            file_id = f"fake-photo-{next(self._ids)}"
+            return self._fake_message(data.get("chat_id"), photo=[
+                {"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 640}
+            ])
+        if endpoint == "sendPoll":
+            poll = {
+                "id": f"fake-poll-{next(self._ids)}",
+                "question": data.get("question", ""),
+                "options": [{"text": str(o), "voter_count": 0} for o in data.get("options", [])],
+                "total_voter_count": 0,
+                "is_closed": False,
+                "is_anonymous": data.get("is_anonymous", True),
+                "type": "regular",
+                "allows_multiple_answers": data.get("allows_multiple_answers", False),
+            }
+            message = self._fake_message(data.get("chat_id"), poll=poll)
+            with self._lock:
+                self._polls[(str(data.get("chat_id")), str(message["message_id"]))] = poll
+            return message
+        if endpoint == "stopPoll":
+            with self._lock:
+                poll = self._polls.get((str(data.get("chat_id")), str(data.get("message_id"))))
+            if poll is None:
+                return {"id": "unknown", "question": "", "options": [], "total_voter_count": 0,
+                        "is_closed": True, "is_anonymous": True, "type": "regular",
+                        "allows_multiple_answers": False}
+            return dict(poll, is_closed=True)
+        if endpoint == "getChatMember":
+            return {"status": "creator", "is_anonymous": False,
+                    "user": {"id": data.get("user_id", 0), "is_bot": False, "first_name": "Replay"}}
+        return True
@@ -0,0 +1,72 @@
+import functools
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from config import LEADER_LEASE_TTL
+from services.state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAMESPACE = "leases"
+
+
+class LeaderElector:
+    """
+    Обирає один процес-лідер через lease у state_store з heartbeat'ами.
+    Лише лідер виконує періодичні jobs; якщо він зникне, lease прострочиться
+    через ttl секунд і його підхопить інший воркер.
+    """
+
+    def __init__(self, name="scheduler", ttl=LEADER_LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _heartbeat(self):
+        try:
+            acquired = state_store.acquire_lease(LEASE_NAMESPACE, self.name, self.owner, self.ttl)
+        except Exception as e:
+            logger.error(f"❌ Leader lease heartbeat failed: {e}")
+            acquired = False
+        if acquired != self.is_leader:
+            logger.info(f"👑 {self.owner} {'became' if acquired else 'lost'} leader for '{self.name}'")
+        self.is_leader = acquired
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._heartbeat()
+            self._stop.wait(self.ttl / 3)
+
+    def start(self):
+        if self._thread:
+            return
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._run, name="leader-elector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            # Звільняємо lease одразу, щоб інший воркер не чекав ttl
+            if state_store.get(LEASE_NAMESPACE, self.name) == self.owner:
+                state_store.pop(LEASE_NAMESPACE, self.name)
+            self.is_leader = False
+
+
+leader_elector = LeaderElector()
+
+
+def leader_only(callback):
+    """Job виконується лише в процесі-лідері; в інших — тиха no-op"""
+    @functools.wraps(callback)
+    def wrapper(context):
+        if not leader_elector.is_leader:
+            return
+        return callback(context)
+    return wrapper
@@ -0,0 +1,182 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Метрики у текстовому форматі Prometheus без зовнішніх залежностей
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Значення обчислюється під час збору: fn() → число або {мітки-tuple: число}"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn, labels=()):
+        super().__init__(name, documentation, labels)
+        self._fn = fn
+
+    def _render_samples(self):
+        try:
+            value = self._fn()
+        except Exception:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_format_labels(self.labels, key)} {v}" for key, v in value.items()]
+        return [f"{self.name} {value}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key → [лічильники кошиків..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            for i, bound in enumerate(self.buckets):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', bound))} {series[i]}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Метрики бота ---
+
+handler_latency = Histogram(
+    "bot_handler_seconds", "Handler latency by command", labels=("handler",))
+handler_errors = Counter(
+    "bot_handler_errors_total", "Handler exceptions by command", labels=("handler",))
+
+sheets_latency = Histogram(
+    "bot_sheets_call_seconds", "gspread call latency", labels=("worksheet", "method"))
+sheets_rows = Counter(
+    "bot_sheets_rows_total", "Rows returned by gspread reads", labels=("worksheet", "method"))
+sheets_bytes = Counter(
+    "bot_sheets_bytes_total", "Approximate cell bytes returned by gspread reads", labels=("worksheet", "method"))
+sheets_errors = Counter(
+    "bot_sheets_errors_total", "gspread call errors", labels=("worksheet", "method"))
+sheets_quota_errors = Counter(
+    "bot_sheets_quota_errors_total", "gspread calls rejected by Google API quota", labels=("worksheet", "method"))
+
+cache_requests = Counter(
+    "bot_cache_requests_total", "Cache lookups by cache and result (hit/shared_hit/revalidate/miss)", labels=("cache", "result"))
+
+telegram_latency = Histogram(
+    "bot_telegram_call_seconds", "Telegram Bot API call latency", labels=("method",))
+telegram_errors = Counter(
+    "bot_telegram_errors_total", "Telegram Bot API errors by exception type", labels=("method", "error"))
+
+chart_render_seconds = Histogram(
+    "bot_chart_render_seconds", "Rating chart render time", labels=("profile",))
+
+
+def register_gauge(name, documentation, fn, labels=()):
+    return Gauge(name, documentation, fn, labels)
+
+
+def instrument_handler(name, callback):
+    """Обгортка хендлера/job: латентність і винятки з міткою handler=name"""
+    @wraps(callback)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return callback(*args, **kwargs)
+        except Exception:
+            handler_errors.inc(handler=name)
+            raise
+        finally:
+            handler_latency.observe(time.perf_counter() - started, handler=name)
+
+    return wrapper
@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from config import (
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_GROUP_RATE,
+    OUTBOUND_CHAT_BURST, OUTBOUND_SENDERS,
+)
+from services.metrics import telegram_latency, telegram_errors, register_gauge
+
+logger = logging.getLogger(__name__)
+
+# Ліміт Telegram на довжину одного повідомлення
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Скільки чекати до наступного токена (0 — можна вже)"""
+        self._refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Op:
+    __slots__ = ("fn", "text", "kwargs", "future")
+
+    def __init__(self, fn, text=None, kwargs=None):
+        self.fn = fn
+        self.text = text            # лише для текстів, які можна склеювати
+        self.kwargs = kwargs or {}
+        self.future = Future()
+
+    def can_merge(self, other):
+        if self.text is None or other.text is None:
+            return False
+        if self.kwargs.get("reply_markup") is not None or other.kwargs.get("reply_markup") is not None:
+            return False
+        return self.kwargs == other.kwargs
+
+
+class OutboundScheduler:
+    """
+    Черга вихідних викликів Bot API з token bucket на чат і глобально.
+    Виклики одного чату йдуть строго по черзі; на RetryAfter чат ставиться
+    на паузу й виклик повторюється. Тексти, що накопичились у черзі одного
+    чату з однаковими параметрами, відправляються одним повідомленням.
+    """
+
+    def __init__(self, global_rate=OUTBOUND_GLOBAL_RATE, senders=OUTBOUND_SENDERS):
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = OrderedDict()    # chat_id → deque(_Op)
+        self._buckets = {}
+        self._blocked_until = {}
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._senders = senders
+        self._threads = []
+        self._stopping = False
+        self.sent = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.errors = 0
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, int) and chat_id < 0
+            rate = OUTBOUND_GROUP_RATE if is_group else OUTBOUND_CHAT_RATE
+            bucket = self._buckets[chat_id] = TokenBucket(rate, OUTBOUND_CHAT_BURST)
+        return bucket
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self._senders):
+            thread = threading.Thread(target=self._run, name=f"outbound-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _submit(self, chat_id, op):
+        if not self._threads:
+            self.start()
+        with self._cond:
+            self._chats.setdefault(chat_id, deque()).append(op)
+            self._cond.notify()
+        return op.future
+
+    def submit_text(self, chat_id, fn, text, kwargs):
+        """fn(text, **kwargs) надсилає текст; повертає Future з Message"""
+        return self._submit(chat_id, _Op(fn, text, kwargs))
+
+    def call(self, chat_id, fn, *args, **kwargs):
+        """Блокуючий виклик через ті самі ліміти (потрібен результат: send_poll тощо)"""
+        op = _Op(lambda: fn(*args, **kwargs))
+        return self._submit(chat_id, op).result()
+
+    def _pick(self, now):
+        """Перший чат, якому дозволено надіслати зараз; інакше — час очікування"""
+        wait = None
+        global_wait = self._global.wait_time(now)
+        for chat_id, ops in self._chats.items():
+            if not ops or chat_id in self._busy:
+                continue
+            chat_wait = max(self._blocked_until.get(chat_id, 0) - now, self._bucket(chat_id).wait_time(now), global_wait)
+            if chat_wait <= 0:
+                return chat_id, 0
+            wait = chat_wait if wait is None else min(wait, chat_wait)
+        return None, wait
+
+    def _take_batch(self, ops):
+        first = ops.popleft()
+        batch = [first]
+        length = len(first.text) if first.text is not None else 0
+        while ops and first.can_merge(ops[0]) and length + 2 + len(ops[0].text) <= MAX_MESSAGE_LENGTH:
+            op = ops.popleft()
+            length += 2 + len(op.text)
+            batch.append(op)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    chat_id, wait = self._pick(now)
+                    if chat_id is not None:
+                        break
+                    if self._stopping and not any(self._chats.values()) and not self._busy:
+                        return
+                    self._cond.wait(timeout=wait if wait is not None else 1.0)
+
+                ops = self._chats[chat_id]
+                batch = self._take_batch(ops)
+                if not ops:
+                    del self._chats[chat_id]
+                else:
+                    self._chats.move_to_end(chat_id)  # справедливість між чатами
+                self._bucket(chat_id).take(now)
+                self._global.take(now)
+                self._busy.add(chat_id)
+
+            self._execute(chat_id, batch)
+
+            with self._cond:
+                self._busy.discard(chat_id)
+                self._cond.notify_all()
+
+    def _execute(self, chat_id, batch):
+        first = batch[0]
+        try:
+            if first.text is not None:
+                text = "\n\n".join(op.text for op in batch)
+                result = first.fn(text, **first.kwargs)
+            else:
+                result = first.fn()
+        except RetryAfter as e:
+            with self._cond:
+                self.retries += 1
+                self._blocked_until[chat_id] = time.monotonic() + float(e.retry_after)
+                self._chats.setdefault(chat_id, deque()).extendleft(reversed(batch))
+                self._chats.move_to_end(chat_id, last=False)
+            logger.warning(f"⏳ Flood limit for chat {chat_id}, retrying in {e.retry_after}s")
+            return
+        except Exception as e:
+            with self._cond:
+                self.errors += 1
+            logger.error(f"❌ Telegram call to chat {chat_id} failed: {e}")
+            for op in batch:
+                op.future.set_exception(e)
+            return
+
+        with self._cond:
+            self.sent += 1
+            self.coalesced += len(batch) - 1
+        for op in batch:
+            op.future.set_result(result)
+
+    def stop(self, timeout=None):
+        """Дочекатися відправки черги й зупинити потоки; повертає звіт для зупинки"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        deadline_at = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline_at is None else max(0.0, deadline_at - time.monotonic()))
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        pending = self.stats()["pending"]
+        return {"ok": pending == 0, "sent": self.sent, "left": pending}
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": sum(len(ops) for ops in self._chats.values()),
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "retries": self.retries,
+                "errors": self.errors,
+            }
+
+
+outbound_scheduler = OutboundScheduler()
+
+register_gauge(
+    "bot_outbound_pending", "Outbound Telegram calls waiting in the flood-aware queue",
+    lambda: outbound_scheduler.stats()["pending"],
+)
+
+
+class ScheduledBot(Bot):
+    """
+    Bot, що пропускає вихідні повідомлення через OutboundScheduler.
+    send_message не блокує і повертає Future; решта методів чекає на результат.
+    """
+
+    def __init__(self, *args, scheduler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._scheduler = scheduler or outbound_scheduler
+
+    def _post(self, endpoint, data=None, *args, **kwargs):
+        # Кожен HTTP-виклик Bot API (включно з тими, що йдуть повз чергу)
+        started = time.perf_counter()
+        try:
+            return super()._post(endpoint, data, *args, **kwargs)
+        except Exception as e:
+            telegram_errors.inc(method=endpoint, error=type(e).__name__)
+            raise
+        finally:
+            telegram_latency.observe(time.perf_counter() - started, method=endpoint)
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        if args:
+            return self._scheduler.call(chat_id, super().send_message, chat_id, text, *args, **kwargs)
+        parent = super().send_message
+        return self._scheduler.submit_text(
+            chat_id, lambda merged_text, **kw: parent(chat_id, merged_text, **kw), text, kwargs
+        )
+
+    def send_photo(self, chat_id, *args, **kwargs):
+        return self._scheduler.call(chat_id, super().send_photo, chat_id, *args, **kwargs)
+
+    def send_poll(self, chat_id, *args, **kwargs):
+        return self._scheduler.call(chat_id, super().send_poll, chat_id, *args, **kwargs)
+
+    def stop_poll(self, chat_id, *args, **kwargs):
+        return self._scheduler.call(chat_id, super().stop_poll, chat_id, *args, **kwargs)
+
+    def delete_message(self, chat_id, *args, **kwargs):
+        return self._scheduler.call(chat_id, super().delete_message, chat_id, *args, **kwargs)
+
+    def edit_message_text(self, text, chat_id=None, *args, **kwargs):
+        return self._scheduler.call(chat_id, super().edit_message_text, text, chat_id, *args, **kwargs)
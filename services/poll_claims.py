@@ -0,0 +1,86 @@
+import uuid
+
+from config import POLL_CLAIM_TTL
+from services.appeals_index import appeals_index
+from services.state_store import state_store
+
+CLAIMS_NAMESPACE = "poll_claims"
+# poll_id вже фіналізованих polls — щоб запізнілі тригери інших воркерів були no-op
+DONE_NAMESPACE = "polls_done"
+DONE_TTL = 7 * 24 * 3600
+# poll_id → нарахований бонус MVP ("pending", поки запис у 'Rating' не завершено)
+SETTLED_NAMESPACE = "polls_settled"
+
+# Результати claim()
+CLAIMED = "claimed"
+FINALIZED = "finalized"   # уже фіналізовано або фіналізується іншим тригером
+UNKNOWN = "unknown"       # рядка poll'а немає в 'Appeals'
+
+
+class PollClaims:
+    """
+    Claim на фіналізацію poll'а: лише один тригер (job, періодична перевірка,
+    /check_polls, PollHandler) проходить далі, решта — дешеві no-op.
+    У процесі claim — перехід статусу в індексі 'Appeals' active → closing;
+    між воркерами — lease у state_store і позначка «фіналізовано».
+    """
+
+    def claim(self, poll_id):
+        """
+        (токен, CLAIMED) або (None, FINALIZED | UNKNOWN). FINALIZED — позначка
+        «фіналізовано» або статус poll'а вже не 'active'; UNKNOWN — poll не
+        знайдено в 'Appeals' навіть після перечитування листа.
+        """
+        if state_store.get(DONE_NAMESPACE, poll_id):
+            return None, FINALIZED
+        # get() перечитує лист для невідомого poll_id (створений іншим воркером)
+        if appeals_index.get(poll_id) is None:
+            return None, UNKNOWN
+        if not appeals_index.transition(poll_id, "active", "closing", reload_missing=False):
+            return None, FINALIZED
+        token = uuid.uuid4().hex
+        if not state_store.acquire_lease(CLAIMS_NAMESPACE, poll_id, token, POLL_CLAIM_TTL):
+            appeals_index.transition(poll_id, "closing", "active", reload_missing=False)
+            return None, FINALIZED
+        return token, CLAIMED
+
+    def _drop_lease(self, poll_id, token):
+        if state_store.get(CLAIMS_NAMESPACE, poll_id) == token:
+            state_store.pop(CLAIMS_NAMESPACE, poll_id)
+
+    def complete(self, poll_id, token):
+        """poll фіналізовано: статус у листі вже записано, повторні тригери ігноруються"""
+        state_store.set(DONE_NAMESPACE, poll_id, True, ttl=DONE_TTL)
+        self._drop_lease(poll_id, token)
+
+    def mark_settled(self, poll_ids):
+        """
+        Позначає бонуси polls як нараховані ДО запису в 'Rating'. Повертає
+        ({poll_id, які ще не були позначені}, {poll_id: бонус} попередніх запусків).
+        Повторний запуск job після збою не нараховує бонус удруге.
+        """
+        fresh, settled = set(), {}
+        for poll_id in poll_ids:
+            previous = state_store.get(SETTLED_NAMESPACE, poll_id)
+            if previous is None:
+                state_store.set(SETTLED_NAMESPACE, poll_id, "pending", ttl=DONE_TTL)
+                fresh.add(poll_id)
+            else:
+                settled[poll_id] = previous
+        return fresh, settled
+
+    def release_settled(self, poll_ids):
+        """Нарахування не вдалося (запис у 'Rating' не відбувся) — бонус можна нарахувати знову"""
+        for poll_id in poll_ids:
+            state_store.pop(SETTLED_NAMESPACE, poll_id)
+
+    def record_bonus(self, poll_id, bonus):
+        state_store.set(SETTLED_NAMESPACE, poll_id, bonus, ttl=DONE_TTL)
+
+    def release(self, poll_id, token):
+        """Фіналізація не вдалася — poll знову доступний для наступного тригера"""
+        appeals_index.transition(poll_id, "closing", "active", reload_missing=False)
+        self._drop_lease(poll_id, token)
+
+
+poll_claims = PollClaims()
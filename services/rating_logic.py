@@ -1,23 +1,20 @@
 import math
-import time
 from datetime import datetime, timedelta
 from collections import defaultdict
-import matplotlib.pyplot as plt
 import io
 
 from config import (
     INITIAL_RATING, MAX_K_FACTOR, MIN_K_FACTOR, STABILIZATION_GAMES,
     HIGH_RATING_THRESHOLD, HIGH_RATING_K_MULTIPLIER, PLAYER_IMBALANCE_FACTOR,
+    CHART_PROFILE, CHART_PROFILES,
 )
 
-from services.sheets import rating_sheet, teams_sheet, match_sheet, cache
+from services.sheets import rating_sheet, teams_sheet, match_sheet, get_cached, invalidate_cached
+from services.teams_index import teams_index
+from services.events import emit, RATINGS_CHANGED
 
 
-def get_current_ratings():
-    now = time.time()
-    if cache["ratings"] and now - cache["ratings_time"] < 60:
-        return cache["ratings"]
-
+def _load_current_ratings():
     all_rows = rating_sheet.get_all_values()
     if len(all_rows) < 2:
         return {}
@@ -35,29 +32,32 @@ def get_current_ratings():
         except:
             value = INITIAL_RATING
         ratings[player] = value
-
-    cache["ratings"] = ratings
-    cache["ratings_time"] = now
     return ratings
 
 
-def get_player_games_count(player_name):
-    now = time.time()
+def get_current_ratings():
+    # копія: update_rating_table доповнює словник новими гравцями
+    return dict(get_cached("ratings", _load_current_ratings))
+
+
+def get_matches_rows():
+    return get_cached("matches_rows", match_sheet.get_all_values)
 
-    if not cache["matches_rows"] or now - cache["matches_time"] > 60:
-        cache["matches_rows"] = match_sheet.get_all_values()
-        cache["matches_time"] = now
 
-    if not cache["teams_rows"] or now - cache["teams_time"] > 60:
-        cache["teams_rows"] = teams_sheet.get_all_values()
-        cache["teams_time"] = now
+def get_teams_rows():
+    return get_cached("teams_rows", teams_sheet.get_all_values)
+
+
+def get_player_games_count(player_name):
+    matches_rows = get_matches_rows()
+    teams_rows = get_teams_rows()
 
     count = 0
-    for match_row in cache["matches_rows"][1:]:
+    for match_row in matches_rows[1:]:
         if len(match_row) < 2:
             continue
         match_date = match_row[1]
-        for team_row in cache["teams_rows"][1:]:
+        for team_row in teams_rows[1:]:
             if len(team_row) >= 6 and team_row[0] == match_date:
                 players = team_row[2].split(", ") + team_row[5].split(", ")
                 if player_name in [p.strip() for p in players if p.strip()]:
@@ -103,14 +103,7 @@ def get_score_multiplier(winner, loser):
 
 
 def get_team_players(team_name, match_date):
-    all_rows = teams_sheet.get_all_values()
-    for row in all_rows[1:]:
-        if len(row) >= 6 and row[0] == match_date:
-            if row[1] == team_name:
-                return row[2].split(", ")
-            elif row[4] == team_name:
-                return row[5].split(", ")
-    return []
+    return teams_index.team_players(team_name, match_date)
 
 
 def get_team_average_rating(players, ratings):
@@ -124,21 +117,14 @@ def get_team_average_rating(players, ratings):
 
 
 def get_last_game_date(player_name):
-    now = time.time()
-
-    if not cache["matches_rows"] or now - cache["matches_time"] > 60:
-        cache["matches_rows"] = match_sheet.get_all_values()
-        cache["matches_time"] = now
-
-    if not cache["teams_rows"] or now - cache["teams_time"] > 60:
-        cache["teams_rows"] = teams_sheet.get_all_values()
-        cache["teams_time"] = now
+    matches_rows = get_matches_rows()
+    teams_rows = get_teams_rows()
 
     dates = []
-    for row in cache["matches_rows"][1:]:
+    for row in matches_rows[1:]:
         if len(row) >= 2:
             match_date = row[1]
-            for team_row in cache["teams_rows"][1:]:
+            for team_row in teams_rows[1:]:
                 if len(team_row) >= 6 and team_row[0] == match_date:
                     players = team_row[2].split(", ") + team_row[5].split(", ")
                     if player_name in [p.strip() for p in players if p.strip()]:
@@ -235,9 +221,29 @@ def update_rating_table(match_id, match_date, team1, team2, score1, score2):
         row.append(new_ratings.get(p, INITIAL_RATING))
 
     rating_sheet.append_row(row)
+    # Наступний /result (у будь-якому воркері) має рахувати від щойно доданого рядка
+    invalidate_cached("ratings")
+
+    changed = [p for p in new_ratings if new_ratings[p] != current_ratings.get(p)]
+    emit(RATINGS_CHANGED, players=sorted(set(changed) | set(team1_players + team2_players)), match_id=match_id)
     return True
 
 
+def _parse_rating_history(headers, data_rows, index):
+    history = []
+    for row in data_rows:
+        if len(row) > 1 and len(row) > index:
+            date_str = row[1]
+            rating = row[index]
+            if rating:
+                try:
+                    date = datetime.strptime(date_str, "%Y-%m-%d")
+                    history.append((date, int(float(rating))))
+                except:
+                    continue
+    return history
+
+
 def get_player_rating_history(player_name):
     all_rows = rating_sheet.get_all_values()
     headers = all_rows[0]
@@ -252,24 +258,26 @@ def get_player_rating_history(player_name):
     if index is None:
         return []
 
-    history = []
-    for row in data_rows:
-        if len(row) > 1 and len(row) > index:
-            date_str = row[1]
-            rating = row[index]
-            if rating:
-                try:
-                    date = datetime.strptime(date_str, "%Y-%m-%d")
-                    history.append((date, int(float(rating))))
-                except:
-                    continue
-    return history
+    return _parse_rating_history(headers, data_rows, index)
 
 
-def create_rating_chart(player_name, history):
-    if not history:
-        return None
+def get_players_rating_history(player_names):
+    """Історії кількох гравців за одне читання листа 'Rating'"""
+    all_rows = rating_sheet.get_all_values()
+    if not all_rows:
+        return {}
+    headers = all_rows[0]
+    data_rows = all_rows[1:]
 
+    histories = {}
+    for player in player_names:
+        if player in headers:
+            histories[player] = _parse_rating_history(headers, data_rows, headers.index(player))
+    return histories
+
+
+def get_weekly_rating_series(history):
+    """Усереднює історію рейтингу по тижнях: повертає (labels, values)"""
     weekly = defaultdict(list)
     for date, rating in history:
         year, week, _ = date.isocalendar()
@@ -285,17 +293,33 @@ def create_rating_chart(player_name, history):
         labels.append(label)
         values.append(avg)
 
-    fig, ax = plt.subplots(figsize=(12, 6))
+    return labels, values
+
+
+def create_rating_chart(player_name, history, profile=None):
+    if not history:
+        return None
+
+    # matplotlib підвантажуємо лише коли справді малюємо графік.
+    # Figure + Agg canvas без pyplot: жодного глобального стану, безпечно з потоків
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    settings = CHART_PROFILES.get(profile or CHART_PROFILE, CHART_PROFILES["telegram"])
+    labels, values = get_weekly_rating_series(history)
+
+    fig = Figure(figsize=settings["figsize"])
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
     ax.plot(labels, values, marker='o', linewidth=2)
     ax.set_xlabel('Week')
     ax.set_ylabel('Rating')
     ax.set_title(f'Weekly Rating: {player_name}')
     ax.tick_params(axis='x', rotation=45)
     ax.grid(True, alpha=0.3)
-    plt.tight_layout()
+    fig.tight_layout()
 
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=300)
+    fig.savefig(buf, format='png', dpi=settings["dpi"])
     buf.seek(0)
-    plt.close()
-    return buf
\ No newline at end of file
+    return buf
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+import time
+
+from config import READY_ROSTER_TTL
+from services.metrics import cache_requests
+from services.sheets import final_score
+from utils.misc import to_a1
+
+# Колонки 'Final Score', з яких будується список готових гравців
+ROSTER_COLUMNS = ("Player Name", "Rating for Team Matching", "is_ready")
+# Сирі числа замість відформатованого тексту ("1,500" → 1500)
+VALUE_RENDER_OPTION = "UNFORMATTED_VALUE"
+
+
+def _to_number(value):
+    # Клітинки читаються як UNFORMATTED_VALUE; для текстових — коми як роздільники тисяч, як у numericise
+    value = str(value).strip().replace(",", "")
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _trim(row):
+    row = [str(value).strip() for value in row]
+    while row and not row[-1]:
+        row.pop()
+    return row
+
+
+def _strip_empty(rows):
+    """Без порожніх рядків у кінці — get_all_values і batch_get дають однаковий хеш"""
+    while rows and not any(rows[-1]):
+        rows.pop()
+    return rows
+
+
+class RosterCache:
+    """
+    Кеш гравців з листа 'Final Score', позначених is_ready == 1.
+
+    Зберігає вже розібраний список (ім'я, рейтинг). Після закінчення TTL
+    одним batch_get читаються лише заголовок і три потрібні колонки; весь
+    лист завантажується тільки при першому читанні, примусовому оновленні
+    або зміні заголовків, а розбір повторюється лише якщо змінився хеш.
+    """
+
+    def __init__(self, ttl=READY_ROSTER_TTL):
+        self.ttl = ttl
+        self.players = None
+        self.digest = None
+        self.headers = None
+        self.columns = None
+        self.row_count = 0
+        self.checked_at = 0
+        self.changed_at = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse(rows):
+        """rows — рядки (ім'я, рейтинг, is_ready) без заголовка"""
+        players = []
+        for name, rating, ready in rows:
+            if _to_number(ready) != 1:
+                continue
+            name = str(name).strip()
+            rating = _to_number(rating)
+            if name and rating is not None:
+                players.append((name, rating))
+        return players
+
+    def _load(self):
+        """Увесь лист: позиції колонок за заголовками і рядки (ім'я, рейтинг, is_ready)"""
+        rows = final_score.get_all_values(value_render_option=VALUE_RENDER_OPTION)
+        headers = [str(h).strip() for h in rows[0]] if rows else []
+        try:
+            columns = tuple(headers.index(name) for name in ROSTER_COLUMNS)
+        except ValueError:
+            raise ValueError("Missing required columns in 'Final Score' sheet")
+
+        self.headers = _trim(headers)
+        self.columns = columns
+        return _strip_empty([[row[idx] if idx < len(row) else "" for idx in columns] for row in rows[1:]])
+
+    def _probe(self):
+        """
+        Заголовок і три колонки одним batch_get. None, якщо заголовки
+        змінилися, — тоді позиції колонок треба визначити заново.
+        """
+        letters = [to_a1(1, idx + 1)[:-1] for idx in self.columns]
+        header, *columns = final_score.batch_get(
+            ["1:1"] + [f"{col}:{col}" for col in letters], value_render_option=VALUE_RENDER_OPTION)
+        if _trim(header[0] if header else []) != self.headers:
+            return None
+
+        cells = [[row[0] if row else "" for row in column[1:]] for column in columns]
+        height = max(len(column) for column in cells)
+        return _strip_empty([[column[i] if i < len(column) else "" for column in cells] for i in range(height)])
+
+    def get_ready_players(self, force=False):
+        """Повертає копію списку готових гравців (балансувальник перемішує його на місці)"""
+        with self._lock:
+            now = time.time()
+            if force or self.players is None:
+                cache_requests.inc(cache="roster", result="miss")
+                rows = self._load()
+            elif now - self.checked_at >= self.ttl:
+                cache_requests.inc(cache="roster", result="revalidate")
+                rows = self._probe()
+                if rows is None:
+                    rows = self._load()
+            else:
+                cache_requests.inc(cache="roster", result="hit")
+                return list(self.players)
+
+            digest = hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()
+            if digest != self.digest:
+                self.players = self._parse(rows)
+                self.digest = digest
+                self.row_count = len(rows) + 1
+                self.changed_at = now
+            self.checked_at = now
+            return list(self.players)
+
+    def invalidate(self):
+        with self._lock:
+            self.checked_at = 0
+
+
+roster_cache = RosterCache()
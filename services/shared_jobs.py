@@ -0,0 +1,106 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+from config import SHARED_JOB_CLAIM_TTL
+from services.state_store import state_store
+
+JOBS_NAMESPACE = "jobs"
+# Хто зараз виконує job: lease з ttl, щоб job упалого воркера підхопив інший
+CLAIMS_NAMESPACE = "job_claims"
+
+# ім'я callback'а → функція; записи в сховищі посилаються на ім'я
+_callbacks = {}
+
+
+def register_job_callback(callback):
+    _callbacks[callback.__name__] = callback
+    return callback
+
+
+def schedule_shared_job(job_queue, callback, when, context, name):
+    """
+    run_once, видимий усім воркерам і стійкий до рестарту: запис лягає в
+    state_store, а локальна JobQueue лише будить процес. Запис видаляється
+    лише після виконання; виконує job той, хто першим візьме claim.
+    """
+    state_store.set(JOBS_NAMESPACE, name, {
+        "callback": callback.__name__,
+        "run_at": time.time() + when,
+        "context": context,
+    })
+    job_queue.run_once(run_shared_job, when=when, context={"name": name}, name=name)
+
+
+def rearm_shared_jobs(job_queue):
+    """При старті: знову ставить у JobQueue всі незавершені jobs із залишком затримки"""
+    now = time.time()
+    rearmed = 0
+    for name, record in state_store.items(JOBS_NAMESPACE):
+        delay = max(0, record.get("run_at", now) - now)
+        job_queue.run_once(run_shared_job, when=delay, context={"name": name}, name=name)
+        rearmed += 1
+    if rearmed:
+        print(f"⏰ Re-armed {rearmed} shared jobs from the state store")
+    return rearmed
+
+
+def _execute(context, name, record):
+    callback = _callbacks.get(record["callback"])
+    if callback is None:
+        print(f"⚠️ Unknown shared job callback: {record['callback']}")
+        return
+    job_context = SimpleNamespace(
+        bot=context.bot,
+        job_queue=context.job_queue,
+        dispatcher=context.dispatcher,
+        job=SimpleNamespace(name=name, context=record["context"]),
+    )
+    callback(job_context)
+
+
+def _claim_and_run(context, name):
+    """
+    claim → виконання → видалення запису (позначка «виконано» — один атомарний pop).
+    Якщо процес упаде посеред виконання, запис лишиться, claim прострочиться,
+    і job повторить наступний воркер/рестарт.
+    """
+    if state_store.get(JOBS_NAMESPACE, name) is None:
+        return False  # уже виконано
+    token = uuid.uuid4().hex
+    if not state_store.acquire_lease(CLAIMS_NAMESPACE, name, token, SHARED_JOB_CLAIM_TTL):
+        return False  # виконує інший воркер
+    try:
+        # Перевіряємо ще раз: між get і claim job міг завершити інший воркер
+        record = state_store.get(JOBS_NAMESPACE, name)
+        if record is None:
+            return False
+        try:
+            _execute(context, name, record)
+        except Exception as e:
+            print(f"❌ Shared job {name} failed: {e}")
+        state_store.pop(JOBS_NAMESPACE, name)
+        return True
+    finally:
+        if state_store.get(CLAIMS_NAMESPACE, name) == token:
+            state_store.pop(CLAIMS_NAMESPACE, name)
+
+
+def run_shared_job(context):
+    _claim_and_run(context, context.job.context["name"])
+
+
+def run_due_shared_jobs(context):
+    """Страховка: підбирає прострочені jobs, чий таймер не спрацював (напр. воркер помер)"""
+    now = time.time()
+    for name, record in state_store.items(JOBS_NAMESPACE):
+        if record.get("run_at", 0) <= now:
+            _claim_and_run(context, name)
+
+
+def pending_shared_jobs_report(remaining=None):
+    """Крок зупинки: jobs лишаються у state_store і будуть підхоплені після рестарту"""
+    from config import STATE_BACKEND
+    pending = [name for name, _ in state_store.items(JOBS_NAMESPACE)]
+    persisted = STATE_BACKEND != "memory"
+    return {"ok": persisted or not pending, "pending": len(pending), "persisted": persisted}
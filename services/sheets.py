@@ -1,65 +1,147 @@
 import time
-import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-
-from config import CREDS_JSON, SPREADSHEET_URL
-
-# Авторизація через Google Service Account
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-
-creds = ServiceAccountCredentials.from_json_keyfile_dict(CREDS_JSON, scope)
-client = gspread.authorize(creds)
-
-# Основна таблиця
-spreadsheet = client.open_by_url(SPREADSHEET_URL)
-final_score = spreadsheet.worksheet("Final Score")
-rating_sheet = spreadsheet.worksheet("Rating")
-match_sheet = spreadsheet.worksheet("Matches")
-teams_sheet = spreadsheet.worksheet("Teams")
-appeals_sheet = spreadsheet.worksheet("Appeals")
-mvp_results_sheet = spreadsheet.worksheet("MVP Results")
-
-# Прості кеші
+import uuid
+
+from config import CREDS_JSON, SPREADSHEET_URL, SHEETS_BACKEND, SHEETS_FAKE_PATH
+from services.state_store import state_store
+from services.metrics import (
+    cache_requests, sheets_latency, sheets_rows, sheets_bytes, sheets_errors, sheets_quota_errors,
+)
+from services.tracing import span
+from utils.misc import is_quota_exceeded_error
+
+if SHEETS_BACKEND == "fake":
+    # Офлайн-таблиця для відтворення логів (main_polling.py --replay)
+    from services.fake_sheets import FakeSpreadsheet
+
+    client = None
+    spreadsheet = FakeSpreadsheet.load(SHEETS_FAKE_PATH)
+else:
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    # Авторизація через Google Service Account
+    scope = [
+        "https://spreadsheets.google.com/feeds",
+        "https://www.googleapis.com/auth/drive"
+    ]
+
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(CREDS_JSON, scope)
+    client = gspread.authorize(creds)
+
+    # Основна таблиця
+    spreadsheet = client.open_by_url(SPREADSHEET_URL)
+
+
+
+def _payload_size(result):
+    """(рядки, приблизні байти) відповіді gspread — для метрик"""
+    if not isinstance(result, list):
+        return 0, 0
+    size = 0
+    for row in result:
+        values = row.values() if isinstance(row, dict) else row if isinstance(row, list) else (row,)
+        size += sum(len(str(value)) for value in values)
+    return len(result), size
+
+
+class InstrumentedWorksheet:
+    """Проксі над Worksheet: кожен виклик методу потрапляє в /metrics і в трасу хендлера"""
+
+    def __init__(self, worksheet, title):
+        self._worksheet = worksheet
+        self._title = title
+
+    def __getattr__(self, name):
+        attr = getattr(self._worksheet, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with span(f"{self._title}.{name}"):
+                    result = attr(*args, **kwargs)
+            except Exception as e:
+                sheets_errors.inc(worksheet=self._title, method=name)
+                if is_quota_exceeded_error(e):
+                    sheets_quota_errors.inc(worksheet=self._title, method=name)
+                raise
+            finally:
+                sheets_latency.observe(time.perf_counter() - started, worksheet=self._title, method=name)
+            rows, size = _payload_size(result)
+            if rows:
+                sheets_rows.inc(rows, worksheet=self._title, method=name)
+                sheets_bytes.inc(size, worksheet=self._title, method=name)
+            return result
+
+        return call
+
+
+def open_worksheet(title):
+    return InstrumentedWorksheet(spreadsheet.worksheet(title), title)
+
+
+final_score = open_worksheet("Final Score")
+rating_sheet = open_worksheet("Rating")
+match_sheet = open_worksheet("Matches")
+teams_sheet = open_worksheet("Teams")
+appeals_sheet = open_worksheet("Appeals")
+mvp_results_sheet = open_worksheet("MVP Results")
+
+# Прості кеші: значення під key, час завантаження під f"{key}_time",
+# спільна версія під f"{key}_version" (див. invalidate_cached)
+CACHE_VERSIONS_NAMESPACE = "cache_versions"
 cache = {
     "ratings": None,
     "ratings_time": 0,
     "matches_rows": None,
-    "matches_time": 0,
+    "matches_rows_time": 0,
     "teams_rows": None,
-    "teams_time": 0,
+    "teams_rows_time": 0,
 }
 
 
-# Отримати існуючі команди на дату
-def get_existing_teams(date=None):
-    try:
-        all_rows = teams_sheet.get_all_values()
-        headers = all_rows[0]
-        data = all_rows[1:]
+def _cache_version(key):
+    return state_store.get(CACHE_VERSIONS_NAMESPACE, key, "")
+
+
+def get_cached(key, loader, ttl=60):
+    """
+    Кеш у два рівні: пам'ять процесу, потім знімок у state_store, який
+    бачать інші воркери. Лише якщо обидва застарілі — читаємо таблицю.
+    Кожен рівень дійсний лише для поточної спільної версії ключа, тож
+    invalidate_cached в одному воркері скидає кеш пам'яті в усіх.
+    """
+    now = time.time()
+    version = _cache_version(key)
+    if (cache.get(key) is not None and cache.get(f"{key}_version", "") == version
+            and now - cache.get(f"{key}_time", 0) < ttl):
+        cache_requests.inc(cache=key, result="hit")
+        return cache[key]
+
+    snapshot = state_store.get("cache", key)
+    if snapshot and snapshot.get("version", "") == version and now - snapshot["time"] < ttl:
+        cache_requests.inc(cache=key, result="shared_hit")
+        cache[key], cache[f"{key}_time"], cache[f"{key}_version"] = snapshot["value"], snapshot["time"], version
+        return cache[key]
 
-        team_names = set()
-        for row in data:
-            if not row:
-                continue
+    cache_requests.inc(cache=key, result="miss")
+    value = loader()
+    # Версія, прочитана до завантаження: інвалідація під час читання не загубиться
+    put_cached(key, value, ttl, now, version)
+    return value
 
-            if date:
-                date_idx = headers.index("date") if "date" in headers else 0
-                if len(row) <= date_idx or row[date_idx] != date:
-                    continue
 
-            for i in range(1, 10):  # team_1, team_2, ..., team_9
-                col_name = f"team_{i}"
-                if col_name in headers:
-                    idx = headers.index(col_name)
-                    if idx < len(row) and row[idx]:
-                        team_names.add(row[idx].strip())
+def put_cached(key, value, ttl=60, now=None, version=None):
+    """Кладе вже прочитане значення в обидва рівні кешу (напр. прогрів при старті)"""
+    now = now or time.time()
+    version = _cache_version(key) if version is None else version
+    cache[key], cache[f"{key}_time"], cache[f"{key}_version"] = value, now, version
+    state_store.set("cache", key, {"time": now, "value": value, "version": version}, ttl=ttl)
 
-        return team_names
 
-    except Exception as e:
-        print(f"Error while fetching existing teams: {e}")
-        return set()
+def invalidate_cached(key):
+    """Скидає обидва рівні кешу після запису, що змінює дані ключа, і нову версію бачать усі воркери"""
+    cache[key], cache[f"{key}_time"] = None, 0
+    state_store.pop("cache", key)
+    state_store.set(CACHE_VERSIONS_NAMESPACE, key, uuid.uuid4().hex)
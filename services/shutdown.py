@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+
+from config import SHUTDOWN_DEADLINE
+
+logger = logging.getLogger(__name__)
+
+
+class ShutdownCoordinator:
+    """
+    Впорядкована зупинка процесу: спершу перестаємо приймати webhook'и,
+    далі кроки виконуються по черзі в межах спільного дедлайну.
+    Кожен крок отримує залишок часу і повертає опис того, що зробив.
+    """
+
+    def __init__(self, deadline=SHUTDOWN_DEADLINE):
+        self.deadline = deadline
+        self.accepting = True
+        self._steps = []
+        self._lock = threading.Lock()
+        self.report = None
+
+    def add_step(self, name, fn):
+        self._steps.append((name, fn))
+
+    def shutdown(self):
+        with self._lock:
+            if self.report is not None:
+                return self.report
+            self.accepting = False
+            deadline_at = time.monotonic() + self.deadline
+            report = {}
+
+            for name, fn in self._steps:
+                remaining = max(0.0, deadline_at - time.monotonic())
+                try:
+                    report[name] = fn(remaining)
+                except Exception as e:
+                    report[name] = {"ok": False, "error": str(e)}
+
+            unfinished = {name: result for name, result in report.items()
+                          if isinstance(result, dict) and not result.get("ok", True)}
+            if unfinished:
+                logger.warning(f"⚠️ Shutdown left unfinished work: {unfinished}")
+            else:
+                logger.info("✅ Graceful shutdown complete")
+            self.report = report
+            return report
+
+
+shutdown_coordinator = ShutdownCoordinator()
@@ -0,0 +1,243 @@
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+
+from config import STATE_BACKEND, STATE_DB_PATH, STATE_REDIS_URL
+
+
+class MemoryStateStore:
+    """Стан лише в пам'яті процесу (один воркер / тести)"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, item, now):
+        return item is not None and (item[1] is None or item[1] > now)
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            item = self._data.get((namespace, str(key)))
+            return item[0] if self._alive(item, time.time()) else default
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[(namespace, str(key))] = (value, expires_at)
+
+    def pop(self, namespace, key, default=None):
+        """Атомарно забирає значення: лише один виклик отримає його"""
+        with self._lock:
+            item = self._data.pop((namespace, str(key)), None)
+            return item[0] if self._alive(item, time.time()) else default
+
+    def acquire_lease(self, namespace, key, owner, ttl):
+        """Бере або продовжує lease: True, якщо він тепер належить owner"""
+        now = time.time()
+        with self._lock:
+            item = self._data.get((namespace, str(key)))
+            if self._alive(item, now) and item[0] != owner:
+                return False
+            self._data[(namespace, str(key))] = (owner, now + ttl)
+            return True
+
+    def items(self, namespace):
+        now = time.time()
+        with self._lock:
+            return [
+                (key, item[0]) for (ns, key), item in self._data.items()
+                if ns == namespace and self._alive(item, now)
+            ]
+
+
+class SQLiteStateStore:
+    """
+    Спільний стан для кількох процесів на одній машині (за замовчуванням).
+    Значення зберігаються як JSON; кожен потік має власне з'єднання.
+    """
+
+    def __init__(self, path=STATE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, default=None):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, str(key), time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, str(key), json.dumps(value, ensure_ascii=False), expires_at),
+        )
+
+    def pop(self, namespace, key, default=None):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?",
+                (namespace, str(key)),
+            ).fetchone()
+            if row:
+                conn.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, str(key)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not row or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return json.loads(row[0])
+
+    def acquire_lease(self, namespace, key, owner, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?",
+                (namespace, str(key)),
+            ).fetchone()
+            if row and row[1] is not None and row[1] > now and json.loads(row[0]) != owner:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, str(key), json.dumps(owner), now + ttl),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def items(self, namespace):
+        rows = self._conn().execute(
+            "SELECT key, value FROM kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time()),
+        ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+
+class RedisStateStore:
+    """Бекенд для кількох машин; потребує пакет redis"""
+
+    def __init__(self, url=STATE_REDIS_URL):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _key(namespace, key):
+        return f"volleybot:{namespace}:{key}"
+
+    def get(self, namespace, key, default=None):
+        raw = self._redis.get(self._key(namespace, key))
+        return json.loads(raw) if raw is not None else default
+
+    def set(self, namespace, key, value, ttl=None):
+        self._redis.set(self._key(namespace, key), json.dumps(value, ensure_ascii=False), ex=int(ttl) if ttl else None)
+
+    def pop(self, namespace, key, default=None):
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.get(self._key(namespace, key))
+        pipe.delete(self._key(namespace, key))
+        raw, _ = pipe.execute()
+        return json.loads(raw) if raw is not None else default
+
+    # Продовжує lease лише власник; інакше — SET NX
+    _LEASE_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if current == false or current == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+        return 1
+    end
+    return 0
+    """
+
+    def acquire_lease(self, namespace, key, owner, ttl):
+        result = self._redis.eval(
+            self._LEASE_SCRIPT, 1, self._key(namespace, key), json.dumps(owner), int(ttl * 1000)
+        )
+        return bool(result)
+
+    def items(self, namespace):
+        prefix = self._key(namespace, "")
+        result = []
+        for full_key in self._redis.scan_iter(f"{prefix}*"):
+            raw = self._redis.get(full_key)
+            if raw is not None:
+                result.append((full_key.decode("utf-8")[len(prefix):], json.loads(raw)))
+        return result
+
+
+def create_state_store(backend=STATE_BACKEND):
+    if backend == "memory":
+        return MemoryStateStore()
+    if backend == "redis":
+        return RedisStateStore()
+    return SQLiteStateStore()
+
+
+state_store = create_state_store()
+
+
+class SharedDict(MutableMapping):
+    """
+    Словник поверх state_store в одному namespace — щоб модульні dict'и
+    (pending_teams тощо) бачили всі воркери. Ключі зберігаються як рядки.
+    """
+
+    def __init__(self, namespace, ttl=None, store=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._store = store or state_store
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self._store.get(self.namespace, key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._store.set(self.namespace, key, value, ttl=self.ttl)
+
+    def __delitem__(self, key):
+        missing = object()
+        if self._store.pop(self.namespace, key, missing) is missing:
+            raise KeyError(key)
+
+    def pop(self, key, *default):
+        missing = object()
+        value = self._store.pop(self.namespace, key, missing)
+        if value is missing:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter([key for key, _ in self._store.items(self.namespace)])
+
+    def __len__(self):
+        return len(self._store.items(self.namespace))
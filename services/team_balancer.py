@@ -1,7 +1,6 @@
 import random
-import pandas as pd
-from services.sheets import spreadsheet, final_score
-from config import INCOMPATIBLE_PAIRS
+from services.roster import roster_cache
+from config import INCOMPATIBLE_PAIRS, TEAMMATE_VARIETY_WEIGHT
 
 
 def get_team_candidates():
@@ -9,15 +8,7 @@ def get_team_candidates():
     Отримати гравців з листа 'Final Score', які позначені як is_ready == 1
     """
     try:
-        final_score
-        df = pd.DataFrame(final_score.get_all_records())
-        df = df.query("is_ready == 1")
-
-        # перевіримо наявність потрібних колонок
-        if "Player Name" not in df.columns or "Rating for Team Matching" not in df.columns:
-            raise ValueError("Missing required columns in 'Final Score' sheet")
-
-        return list(zip(df["Player Name"], df["Rating for Team Matching"]))
+        return roster_cache.get_ready_players()
     except Exception as e:
         print(f"❌ Error loading players from Final Score: {e}")
         return []
@@ -29,9 +20,84 @@ def violates_restriction(team, forbidden_pairs):
     return any(a in names and b in names for a, b in forbidden_pairs)
 
 
-def regenerate_teams_logic(players, num_teams=2, max_difference=20):
+def team_spread(team_sums, team_counts):
+    avg_scores = [team_sums[i] / team_counts[i] for i in range(len(team_sums))]
+    return max(avg_scores) - min(avg_scores)
+
+
+def improve_team_variety(teams, history, max_difference=20, variety_weight=TEAMMATE_VARIETY_WEIGHT, max_rounds=50):
+    """
+    Локальний пошук обмінами гравців між командами: мінімізує
+    різницю середніх рейтингів + variety_weight × штраф за повторні пари,
+    не порушуючи max_difference та INCOMPATIBLE_PAIRS.
+    """
+    penalty = history.penalty_matrix()
+    known = len(penalty)
+    next_id = known
+    ids = []
+    for team in teams:
+        team_ids = []
+        for name, _ in team:
+            idx = history.index.get(name)
+            if idx is None or idx >= known:
+                idx, next_id = next_id, next_id + 1  # новачок без історії — штраф 0
+            team_ids.append(idx)
+        ids.append(team_ids)
+
+    def pair(a, b):
+        return penalty[a][b] if a < known and b < known else 0.0
+
+    team_sums = [sum(score for _, score in team) for team in teams]
+    team_counts = [len(team) for team in teams]
+    spread = team_spread(team_sums, team_counts)
+
+    for _ in range(max_rounds):
+        improved = False
+        for t in range(len(teams)):
+            for u in range(t + 1, len(teams)):
+                for x, a in enumerate(ids[t]):
+                    score_a = teams[t][x][1]
+                    for y, b in enumerate(ids[u]):
+                        score_b = teams[u][y][1]
+
+                        delta_pen = 0.0
+                        for k in ids[t]:
+                            if k != a:
+                                delta_pen += pair(b, k) - pair(a, k)
+                        for k in ids[u]:
+                            if k != b:
+                                delta_pen += pair(a, k) - pair(b, k)
+
+                        new_sums = team_sums[:]
+                        new_sums[t] += score_b - score_a
+                        new_sums[u] += score_a - score_b
+                        new_spread = team_spread(new_sums, team_counts)
+                        if new_spread > max_difference:
+                            continue
+                        if (new_spread - spread) + variety_weight * delta_pen >= -1e-9:
+                            continue
+
+                        new_t = teams[t][:x] + [teams[u][y]] + teams[t][x + 1:]
+                        new_u = teams[u][:y] + [teams[t][x]] + teams[u][y + 1:]
+                        if violates_restriction(new_t, INCOMPATIBLE_PAIRS) or violates_restriction(new_u, INCOMPATIBLE_PAIRS):
+                            continue
+
+                        teams[t], teams[u] = new_t, new_u
+                        ids[t][x], ids[u][y] = b, a
+                        team_sums, spread = new_sums, new_spread
+                        a, score_a = b, score_b
+                        improved = True
+        if not improved:
+            break
+
+    return teams, team_sums, team_counts
+
+
+def regenerate_teams_logic(players, num_teams=2, max_difference=20, history=None,
+                           variety_weight=TEAMMATE_VARIETY_WEIGHT):
     """
-    Розподіляє гравців на збалансовані команди
+    Розподіляє гравців на збалансовані команди.
+    Якщо передано history (TeammateHistory), додатково уникає повторних пар.
     """
     max_players_per_team = len(players) // num_teams
 
@@ -73,4 +139,6 @@ def regenerate_teams_logic(players, num_teams=2, max_difference=20):
         avg_scores = [team_sums[i] / team_counts[i] for i in range(num_teams)]
         if abs(max(avg_scores) - min(avg_scores)) <= max_difference:
             if all(not violates_restriction(t, INCOMPATIBLE_PAIRS) for t in teams):
+                if history is not None and variety_weight:
+                    return improve_team_variety(teams, history, max_difference, variety_weight)
                 return teams, team_sums, team_counts
@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+
+from config import TEAMMATE_HISTORY_HALF_LIFE_DAYS, TEAMMATE_HISTORY_TTL
+from services.sheets import teams_sheet
+
+
+class TeammateHistory:
+    """
+    Матриця спільних ігор гравців (player × player), побудована з листа 'Teams'.
+
+    Для кожної пари зберігається кількість спільних команд, дата останньої
+    спільної гри та зважена за давністю оцінка. Рядки листа обробляються
+    інкрементально: при оновленні парсяться лише нові рядки.
+    """
+
+    def __init__(self, half_life_days=TEAMMATE_HISTORY_HALF_LIFE_DAYS):
+        self.half_life_days = half_life_days
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.index = {}        # ім'я → номер рядка/стовпця матриці
+        self.names = []
+        self.counts = []       # counts[i][j] — скільки разів грали разом
+        self.last_played = []  # last_played[i][j] — ordinal дати останньої спільної гри
+        self._weights = []     # зважені оцінки відносно self._epoch
+        self._epoch = None
+        self._rows_seen = 0
+        self._header = None
+        self._roster_cols = []
+        self._date_idx = 0
+        self._penalty = None
+        self._penalty_day = None
+        self.loaded_at = 0
+
+    # --- побудова ---
+
+    def _player_idx(self, name):
+        idx = self.index.get(name)
+        if idx is not None:
+            return idx
+        idx = len(self.names)
+        self.index[name] = idx
+        self.names.append(name)
+        for row in self.counts:
+            row.append(0)
+        for row in self.last_played:
+            row.append(0)
+        for row in self._weights:
+            row.append(0.0)
+        self.counts.append([0] * (idx + 1))
+        self.last_played.append([0] * (idx + 1))
+        self._weights.append([0.0] * (idx + 1))
+        return idx
+
+    def _resolve_header(self, header):
+        self._header = header
+        self._date_idx = header.index("date") if "date" in header else 0
+        self._roster_cols = [
+            idx for idx, col in enumerate(header)
+            if col.startswith("team_") and col.endswith("_players")
+        ]
+
+    def add_roster(self, players, day):
+        """Додає один склад команди, зіграний у день з ordinal `day`"""
+        ids = sorted({self._player_idx(p) for p in players})
+        if self._epoch is None:
+            self._epoch = day
+        weight = 2.0 ** ((day - self._epoch) / self.half_life_days)
+
+        counts, last, weights = self.counts, self.last_played, self._weights
+        for a_pos, a in enumerate(ids):
+            for b in ids[a_pos + 1:]:
+                counts[a][b] += 1
+                counts[b][a] += 1
+                weights[a][b] += weight
+                weights[b][a] += weight
+                if day > last[a][b]:
+                    last[a][b] = last[b][a] = day
+        self._penalty = None
+
+    def _ingest_rows(self, rows):
+        for row in rows:
+            if len(row) <= self._date_idx:
+                continue
+            try:
+                day = datetime.strptime(row[self._date_idx].strip(), "%Y-%m-%d").toordinal()
+            except ValueError:
+                continue
+            for col in self._roster_cols:
+                if col < len(row) and row[col]:
+                    players = [p.strip() for p in row[col].split(",") if p.strip()]
+                    if len(players) > 1:
+                        self.add_roster(players, day)
+
+    def refresh(self, force=False):
+        """Дочитує нові рядки 'Teams'; повністю перебудовує, якщо лист змінився"""
+        with self._lock:
+            now = time.time()
+            if not force and self._header is not None and now - self.loaded_at < TEAMMATE_HISTORY_TTL:
+                return self
+            try:
+                all_rows = teams_sheet.get_all_values()
+            except Exception as e:
+                print(f"⚠️ Error while loading teammate history: {e}")
+                return self
+
+            if not all_rows:
+                self._reset()
+                self.loaded_at = now
+                return self
+
+            header, data = all_rows[0], all_rows[1:]
+            if header != self._header or len(data) < self._rows_seen:
+                # Змінилися колонки або видалено рядки — перебудовуємо з нуля
+                self._reset()
+                self._resolve_header(header)
+
+            self._ingest_rows(data[self._rows_seen:])
+            self._rows_seen = len(data)
+            self.loaded_at = now
+            return self
+
+    # --- запити ---
+
+    def penalty_matrix(self, today=None):
+        """
+        Матриця штрафів penalty[i][j] = Σ 0.5^(вік гри в днях / half_life).
+        Кешується на день, тож пошук у балансувальнику — два індекси списку.
+        """
+        today = today or datetime.now().toordinal()
+        if self._penalty is not None and self._penalty_day == today:
+            return self._penalty
+        if self._epoch is None:
+            self._penalty = []
+        else:
+            scale = 2.0 ** (-(today - self._epoch) / self.half_life_days)
+            self._penalty = [[w * scale for w in row] for row in self._weights]
+        self._penalty_day = today
+        return self._penalty
+
+    def pair_penalty(self, a, b, today=None):
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None:
+            return 0.0
+        return self.penalty_matrix(today)[i][j]
+
+    def times_together(self, a, b):
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None:
+            return 0
+        return self.counts[i][j]
+
+
+teammate_history = TeammateHistory()
+
+
+def get_teammate_history():
+    return teammate_history.refresh()
@@ -0,0 +1,85 @@
+import re
+import threading
+
+from services.sheets import teams_sheet, get_cached, invalidate_cached
+
+_TEAM_COLUMN = re.compile(r"team_(\d+)$")
+
+
+def _build(rows):
+    """date → {назва команди → склад}; пізніший рядок дати з тією ж командою має пріоритет"""
+    if not rows:
+        return {}
+
+    # Позиції колонок — один раз на знімок, для будь-якої кількості команд
+    headers = [header.strip() for header in rows[0]]
+    positions = {header: idx for idx, header in enumerate(headers)}
+    date_idx = positions.get("date", 0)
+    team_cols = sorted(
+        (int(match.group(1)), idx, positions[f"team_{match.group(1)}_players"])
+        for idx, header in enumerate(headers)
+        for match in [_TEAM_COLUMN.match(header)]
+        if match and f"team_{match.group(1)}_players" in positions
+    )
+
+    by_date = {}
+    for row in rows[1:]:
+        if len(row) <= date_idx or not row[date_idx]:
+            continue
+        teams = by_date.setdefault(row[date_idx], {})
+        for _, team_idx, players_idx in team_cols:
+            team_name = row[team_idx].strip() if team_idx < len(row) else ""
+            if not team_name:
+                continue
+            players_str = row[players_idx] if players_idx < len(row) else ""
+            teams[team_name] = [p.strip() for p in players_str.split(",") if p.strip()]
+    return by_date
+
+
+class TeamsIndex:
+    """
+    Розібраний лист 'Teams': дата → {назва команди → склад}. Будується з одного
+    знімка (той самий кеш "teams_rows", що й у rating_logic) і перебудовується
+    лише коли знімок змінився; після запису в 'Teams' — invalidate().
+    """
+
+    def __init__(self):
+        self._rows = None
+        self._by_date = {}
+        self._lock = threading.Lock()
+
+    def _snapshot(self):
+        rows = get_cached("teams_rows", teams_sheet.get_all_values)
+        with self._lock:
+            if rows is not self._rows:
+                self._by_date = _build(rows)
+                self._rows = rows
+            return self._by_date
+
+    def teams_for_date(self, date):
+        return {team: list(players) for team, players in self._snapshot().get(date, {}).items()}
+
+    def team_names(self, date=None):
+        by_date = self._snapshot()
+        if date:
+            return set(by_date.get(date, {}))
+        return {team for teams in by_date.values() for team in teams}
+
+    def team_players(self, team_name, date):
+        return list(self._snapshot().get(date, {}).get(team_name, []))
+
+    def invalidate(self):
+        """Після запису в 'Teams': нова версія кешу змушує всі воркери перечитати лист"""
+        invalidate_cached("teams_rows")
+
+
+teams_index = TeamsIndex()
+
+
+# Отримати існуючі команди на дату
+def get_existing_teams(date=None):
+    try:
+        return teams_index.team_names(date)
+    except Exception as e:
+        print(f"Error while fetching existing teams: {e}")
+        return set()
@@ -0,0 +1,245 @@
+import heapq
+import hmac
+import inspect
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from config import TRACING_ENABLED, TRACE_SLOWEST, PROFILE_MAX_SECONDS, ADMIN_TOKEN
+
+# Ліміт вкладених спанів на одну трасу, щоб цикли не роздували пам'ять
+MAX_SPANS_PER_TRACE = 500
+
+# Модулі services/, функції яких не обгортаємо (сама інфраструктура вимірювань)
+_UNTRACED_MODULES = {"services.metrics", "services.tracing"}
+
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ("name", "started", "duration", "calls", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.calls = 1
+        self.children = []
+
+    def to_dict(self):
+        item = {"name": self.name, "ms": round(self.duration * 1000, 2)}
+        if self.calls > 1:
+            item["calls"] = self.calls
+        if self.children:
+            item["children"] = [child.to_dict() for child in self.children]
+        return item
+
+
+class TraceBuffer:
+    """N найповільніших трас (min-heap за тривалістю кореневого спану)"""
+
+    def __init__(self, size=TRACE_SLOWEST):
+        self.size = size
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, root):
+        entry = (root.duration, next(self._seq), time.time(), root)
+        with self._lock:
+            self.recorded += 1
+            if len(self._heap) < self.size:
+                heapq.heappush(self._heap, entry)
+            elif root.duration > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self):
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [dict(root.to_dict(), finished_at=finished_at) for _, _, finished_at, root in entries]
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+trace_buffer = TraceBuffer()
+
+
+def _enter(name):
+    """Новий дочірній спан поточної траси або None, якщо траси немає / ліміт вичерпано"""
+    stack = getattr(_local, "stack", None)
+    if not stack or _local.spans >= MAX_SPANS_PER_TRACE:
+        return None
+    _local.spans += 1
+    child = Span(name)
+    stack.append(child)
+    return child
+
+
+def _exit(child):
+    stack = _local.stack
+    stack.pop()
+    child.duration = time.perf_counter() - child.started
+    siblings = stack[-1].children
+    # Повторні виклики-листки з тим самим ім'ям згортаємо в один спан з лічильником
+    if siblings and not child.children and siblings[-1].name == child.name and not siblings[-1].children:
+        siblings[-1].duration += child.duration
+        siblings[-1].calls += 1
+    else:
+        siblings.append(child)
+
+
+@contextmanager
+def span(name):
+    child = _enter(name)
+    if child is None:
+        yield
+        return
+    try:
+        yield
+    finally:
+        _exit(child)
+
+
+def traced(func, name=None):
+    """Обгортка функції сервісу: спан лише всередині активної траси"""
+    name = name or f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        child = _enter(name)
+        if child is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _exit(child)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def trace_handler(name, callback):
+    """Коренева траса для хендлера/job; завершена траса потрапляє в trace_buffer"""
+    if not TRACING_ENABLED:
+        return callback
+
+    @wraps(callback)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, "stack", None):
+            # Хендлер, викликаний з іншого хендлера, — лише вкладений спан
+            with span(name):
+                return callback(*args, **kwargs)
+        root = Span(name)
+        _local.stack, _local.spans = [root], 1
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            root.duration = time.perf_counter() - root.started
+            _local.stack = None
+            trace_buffer.add(root)
+
+    return wrapper
+
+
+def _is_traceable(value, module_name, attr):
+    return (
+        inspect.isfunction(value)
+        and value.__module__ == module_name
+        and not attr.startswith("_")
+        and not getattr(value, "__traced__", False)
+        and not inspect.isgeneratorfunction(value)
+        and not inspect.iscoroutinefunction(value)
+    )
+
+
+_installed = False
+
+
+def install_service_tracing():
+    """
+    Обгортає публічні функції всіх завантажених модулів services/ і підміняє
+    посилання на них у services/, handlers/ та bot_setup (from ... import ...),
+    щоб вкладені виклики потрапляли в трасу. Викликати після імпорту хендлерів.
+    """
+    global _installed
+    if _installed or not TRACING_ENABLED:
+        return
+    _installed = True
+
+    modules = [(name, module) for name, module in list(sys.modules.items()) if module is not None]
+    wrapped = {}
+    for name, module in modules:
+        if not name.startswith("services.") or name in _UNTRACED_MODULES:
+            continue
+        short_name = name.split(".", 1)[1]
+        for attr, value in list(vars(module).items()):
+            if _is_traceable(value, name, attr):
+                wrapped[value] = traced(value, f"{short_name}.{attr}")
+
+    for name, module in modules:
+        if not (name.startswith(("services.", "handlers.")) or name == "bot_setup"):
+            continue
+        for attr, value in list(vars(module).items()):
+            if inspect.isfunction(value) and value in wrapped:
+                setattr(module, attr, wrapped[value])
+
+
+# --- Семплювальний профайлер ---
+
+class SamplingProfiler:
+    """
+    Періодично знімає стеки всіх потоків (sys._current_frames) упродовж вікна
+    і повертає їх у folded-форматі ("потік;f1;f2 кількість") для flamegraph.pl/speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fold(frame, thread_name):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+    def run(self, seconds):
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Profiler is already running")
+        try:
+            seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+            own_ident = threading.get_ident()
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident != own_ident:
+                        stacks[self._fold(frame, names.get(ident, str(ident)))] += 1
+                time.sleep(self.interval)
+            return stacks
+        finally:
+            self._lock.release()
+
+
+def render_folded(stacks):
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profiler = SamplingProfiler()
+
+
+def is_admin_token(token):
+    """Доступ до /debug/* лише з ADMIN_TOKEN; без нього в env ендпоінти вимкнені"""
+    return bool(ADMIN_TOKEN) and hmac.compare_digest((token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DISPATCHER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Скільки update одна смуга обробляє підряд, перш ніж поступитися потоком іншим чатам
+LANE_BATCH = 8
+
+
+def get_lane_key(update):
+    """Ключ послідовної смуги: chat_id, а для update без чату (poll) — окремі смуги"""
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    if update.poll is not None:
+        return f"poll:{update.poll.id}"
+    return "no_chat"
+
+
+class UpdateWorkerPool:
+    """
+    Розбирає update_queue Dispatcher'а по смугах chat_id.
+    Оновлення одного чату виконуються строго по черзі, різні чати —
+    паралельно на спільному пулі потоків. Глобального локу немає.
+    """
+
+    def __init__(self, dispatcher, workers=DISPATCHER_WORKERS):
+        self.dispatcher = dispatcher
+        self.queue = dispatcher.update_queue
+        self.workers = workers
+        self._executor = None
+        self._router = None
+        self._lanes = {}        # lane key → deque(update)
+        self._running = set()   # смуги, які зараз обробляє якийсь потік
+        self._enqueued_at = {}
+        self._pending = 0       # прийняті через enqueue, але ще не оброблені
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+
+    def start(self):
+        if self._router:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="update-worker")
+        self._router = threading.Thread(target=self._route, name="update-router", daemon=True)
+        self._router.start()
+        logger.info(f"✅ Update worker pool started ({self.workers} workers)")
+
+    def enqueue(self, update):
+        with self._lock:
+            self._enqueued_at[id(update)] = time.time()
+            self._pending += 1
+        self.queue.put(update)
+
+    def _route(self):
+        while True:
+            update = self.queue.get()
+            if update is None:  # сигнал зупинки
+                break
+            try:
+                key = get_lane_key(update)
+            except Exception:
+                key = "no_chat"
+            with self._lock:
+                self._lanes.setdefault(key, deque()).append(update)
+                if key in self._running:
+                    continue
+                self._running.add(key)
+            self._submit(key)
+
+    def _submit(self, key):
+        """Ставить смугу в чергу пулу; якщо пул уже зупинено — її update відкидаються"""
+        try:
+            self._executor.submit(self._drain, key)
+        except RuntimeError:
+            with self._lock:
+                lane = self._lanes.pop(key, None) or ()
+                self._running.discard(key)
+                for update in lane:
+                    self._enqueued_at.pop(id(update), None)
+                self.dropped += len(lane)
+                self._pending = max(0, self._pending - len(lane))
+            if lane:
+                logger.warning(f"⚠️ Worker pool is stopped, dropped {len(lane)} update(s) of lane {key}")
+
+    def _drain(self, key):
+        for _ in range(LANE_BATCH):
+            with self._lock:
+                lane = self._lanes.get(key)
+                if not lane:
+                    self._lanes.pop(key, None)
+                    self._running.discard(key)
+                    return
+                update = lane.popleft()
+            self._process(update)
+
+        # Смуга ще не порожня — ставимо її в кінець черги пулу
+        self._submit(key)
+
+    def _record_lag(self, update):
+        with self._lock:
+            enqueued_at = self._enqueued_at.pop(id(update), None)
+            if enqueued_at is None:
+                return
+            lag = time.time() - enqueued_at
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.avg_lag = lag if not self.processed else self.avg_lag * 0.9 + lag * 0.1
+
+    def _process(self, update):
+        self._record_lag(update)
+        try:
+            self.dispatcher.process_update(update)
+            with self._lock:
+                self.processed += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"❌ Error while processing update: {e}")
+        finally:
+            with self._lock:
+                self._pending = max(0, self._pending - 1)
+
+    def wait_until_idle(self, timeout=None, poll_interval=0.01):
+        """Чекає, доки черга та всі смуги спорожніють (для бенчмарків і зупинки)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                idle = self._pending == 0 and not self._lanes and not self._running
+            if idle:
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+    def drain(self, timeout):
+        """Доробляє чергу в межах timeout і зупиняє пул; повертає звіт для зупинки"""
+        drained = self.wait_until_idle(timeout)
+        with self._lock:
+            left = self._pending
+        self.stop(timeout=1 if not drained else None)
+        return {"ok": drained, "processed": self.processed, "left": left}
+
+    def stop(self, timeout=None):
+        if not self._router:
+            return
+        self.queue.put(None)
+        self._router.join(timeout)
+        # Після невдалого дренажу не чекаємо зависаючі хендлери
+        self._executor.shutdown(wait=timeout is None)
+        self._router = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers if self._router else 0,
+                "queue_depth": self.queue.qsize() + sum(len(lane) for lane in self._lanes.values()),
+                "lanes_active": len(self._running),
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "lag_last_seconds": round(self.last_lag, 4),
+                "lag_avg_seconds": round(self.avg_lag, 4),
+                "lag_max_seconds": round(self.max_lag, 4),
+            }
@@ -13,6 +13,15 @@ def is_quota_exceeded_error(e):
     ])
 
 
+def to_a1(row, col):
+    """(5, 7) → 'G5' — адреса клітинки для batch_update (row, col 1-based)"""
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return f"{letters}{row}"
+
+
 def get_today_date():
     """Повертає поточну дату у форматі YYYY-MM-DD"""
     return datetime.now().strftime("%Y-%m-%d")
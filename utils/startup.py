@@ -0,0 +1,46 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# Важкі залежності, які мають підвантажуватися лише на вимогу
+HEAVY_MODULES = ("pandas", "matplotlib", "faker", "numpy")
+
+_boot_started = time.perf_counter()
+_boot_finished = None
+_phases = []
+
+
+@contextmanager
+def import_phase(name):
+    """
+    Замірює час етапу запуску та які пакети верхнього рівня він підвантажив.
+    Для детальної розбивки по модулях: python -X importtime main.py
+    """
+    before = set(sys.modules)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        loaded = {name.split(".")[0] for name in set(sys.modules) - before}
+        _phases.append({
+            "phase": name,
+            "seconds": round(elapsed, 4),
+            "new_packages": sorted(loaded),
+        })
+
+
+def mark_boot_finished():
+    global _boot_finished
+    _boot_finished = time.perf_counter()
+
+
+def startup_report():
+    """Звіт для endpoint /startup"""
+    finished = _boot_finished or time.perf_counter()
+    return {
+        "boot_seconds": round(finished - _boot_started, 4),
+        "phases": sorted(_phases, key=lambda p: p["seconds"], reverse=True),
+        "heavy_modules_loaded": {name: name in sys.modules for name in HEAVY_MODULES},
+        "modules_total": len(sys.modules),
+    }